@@ -29,7 +29,7 @@ import {
   Calendar
 } from 'lucide-react';
 import { getUser, isAdmin, logout } from '@/lib/auth';
-import { tasksAPI, pointsAPI, userAPI, notificationsAPI } from '@/lib/api';
+import { dashboardAPI, notificationsAPI } from '@/lib/api';
 
 const Layout = ({ children }) => {
   const [sidebarOpen, setSidebarOpen] = useState(false);
@@ -58,29 +58,20 @@ const Layout = ({ children }) => {
       try {
         setLoading(true);
         
+        // 一次请求获取聚合后的统计数据，不再拉取完整任务列表
+        const { data: summary } = await dashboardAPI.getSummary();
+        
         if (isAdminUser) {
-          // 管理员获取所有统计数据
-          const [tasksResponse, userStatsResponse] = await Promise.all([
-            tasksAPI.getTasks(),
-            userAPI.getUserStats()
-          ]);
-          
           setStats({
             currentPoints: 0, // 管理员不显示个人积分
-            totalTasks: tasksResponse.data.tasks?.length || 0,
-            monthlyTrend: userStatsResponse.data.total_users || 0 // 显示实际用户数量
+            totalTasks: summary.total_tasks || 0,
+            monthlyTrend: summary.total_users || 0 // 显示实际用户数量
           });
         } else {
-          // 普通用户获取个人统计数据
-          const [tasksResponse, pointsResponse] = await Promise.all([
-            tasksAPI.getTasks({ assigned_to_me: true }),
-            pointsAPI.getMyPoints()
-          ]);
-          
           setStats({
-            currentPoints: pointsResponse.data.total_points || 0,
-            totalTasks: tasksResponse.data.tasks?.length || 0,
-            monthlyTrend: (pointsResponse.data.total_points || 0) * 2.5 // 简单估算月收入
+            currentPoints: summary.total_points || 0,
+            totalTasks: summary.total_tasks || 0,
+            monthlyTrend: (summary.total_points || 0) * 2.5 // 简单估算月收入
           });
         }
       } catch (error) {
@@ -130,9 +121,58 @@ const Layout = ({ children }) => {
 
     fetchNotifications();
     
-    // 每30秒刷新一次通知
-    const interval = setInterval(fetchNotifications, 30000);
-    return () => clearInterval(interval);
+    if (!isAdminUser) {
+      return;
+    }
+    
+    // 不支持 EventSource 的浏览器退回每30秒轮询
+    if (typeof EventSource === 'undefined') {
+      const interval = setInterval(fetchNotifications, 30000);
+      return () => clearInterval(interval);
+    }
+    
+    // 服务器推送新通知和未读数变化
+    // 推送令牌只在建立连接时有效，浏览器自动重连会沿用过期的令牌，所以断线后自行换新令牌重连；
+    // 连接数已满或签发失败时先拉取一次，稍后再试
+    let source = null;
+    let timer = null;
+    let closed = false;
+    
+    const reconnect = (delay) => {
+      fetchNotifications();
+      timer = setTimeout(connect, delay);
+    };
+    
+    const connect = async () => {
+      let token;
+      try {
+        token = (await notificationsAPI.getStreamToken()).data.token;
+      } catch (error) {
+        if (!closed) reconnect(30000);
+        return;
+      }
+      if (closed) return;
+      
+      source = new EventSource(notificationsAPI.getStreamUrl(token));
+      source.addEventListener('unread_count', (event) => {
+        setUnreadCount(JSON.parse(event.data).unread_count || 0);
+      });
+      source.addEventListener('notification', (event) => {
+        const notification = JSON.parse(event.data);
+        setNotifications((prev) => [notification, ...prev.filter((n) => n.id !== notification.id)]);
+      });
+      source.onerror = () => {
+        source.close();
+        if (!closed) reconnect(5000);
+      };
+    };
+    
+    connect();
+    return () => {
+      closed = true;
+      clearTimeout(timer);
+      if (source) source.close();
+    };
   }, [isAdminUser]);
 
   const navigation = isAdminUser
@@ -57,21 +57,28 @@ export const authAPI = {
 
 // 任务相关API
 export const tasksAPI = {
-  getTasks: (params) => api.get('/tasks', { params }),
+  // 兼容旧页面：一次性获取完整列表
+  getTasks: (params) => api.get('/tasks', { params: { paginate: false, ...params } }),
+  // 游标分页：params 可包含 cursor、limit、status、assigned_to、publisher、created_from、created_to
+  getTaskPage: (params) => api.get('/tasks', { params }),
   createTask: (data) => api.post('/tasks', data),
   getTask: (id) => api.get(`/tasks/${id}`),
   updateTask: (id, data) => api.put(`/tasks/${id}`, data),
   deleteTask: (id) => api.delete(`/tasks/${id}`),
+  bulkDeleteTasks: (ids, mode = 'delete') => api.post('/tasks/bulk-delete', { ids, mode }),  // mode: delete | archive
   assignTask: (id) => api.post(`/tasks/${id}/assign`),
   submitTask: (id, data) => api.post(`/tasks/${id}/submit`, data),
 };
 
 // 提交审核相关API
 export const submissionsAPI = {
-  getSubmissions: (params) => api.get('/submissions', { params }),
+  getSubmissions: (params) => api.get('/submissions', { params: { paginate: false, ...params } }),
   getSubmission: (id) => api.get(`/submissions/${id}`),
   reviewSubmission: (id, data) => api.post(`/submissions/${id}/review`, data),
-  getMySubmissions: () => api.get('/submissions/my'),
+  reviewSubmissionsBatch: (reviews) => api.post('/submissions/review/batch', { reviews }),
+  leaseNextSubmissions: (limit = 1) => api.post('/submissions/next', null, { params: { limit } }),
+  releaseSubmission: (id) => api.post(`/submissions/${id}/release`),
+  getMySubmissions: (params) => api.get('/submissions/my', { params: { paginate: false, ...params } }),
 };
 
 // 用户相关API
@@ -89,18 +96,32 @@ export const notificationsAPI = {
   getNotificationCount: () => api.get('/notifications/count'),
   markAsRead: (id) => api.post(`/notifications/${id}/read`),
   markAllAsRead: () => api.post('/notifications/read-all'),
-  getAdminSubmissionNotifications: () => api.get('/notifications/admin/submissions')
+  getAdminSubmissionNotifications: () => api.get('/notifications/admin/submissions'),
+  // SSE 推送：EventSource 无法设置请求头，先换取短期的推送令牌再放进地址，登录令牌不出现在 URL 中
+  getStreamToken: () => api.post('/notifications/stream-token'),
+  getStreamUrl: (token) => `${api.defaults.baseURL}/notifications/stream?jwt=${encodeURIComponent(token)}`
 };
 
 // 积分相关API
 export const pointsAPI = {
   getMyPoints: () => api.get('/points/my'),  // 新增：获取当前用户积分
+  getMyLedger: (params) => api.get('/points/my/ledger', { params }),  // 积分流水（游标分页：from、to、type、cursor）
   getUserPoints: (userId, params) => api.get(`/points/user/${userId}`, { params }),
   getMonthlyPoints: (params) => api.get('/points/monthly', { params }),
+  getTimeseries: (params) => api.get('/points/timeseries', { params }),  // 多月积分趋势
   getMonthlySettings: (params) => api.get('/monthly/settings', { params }),
   setMonthlySettings: (data) => api.post('/monthly/settings', data),
   calculateMonthlySalary: (params) => api.get('/monthly/salary', { params }),
   finalizeMonthlySettings: (data) => api.post('/monthly/finalize', data),
+  // 文件导出（format: csv | xlsx），以 blob 形式下载
+  exportMonthlySalary: (params) => api.get('/monthly/salary/export', { params, responseType: 'blob' }),
+  exportMonthlyPoints: (params) => api.get('/points/monthly/export', { params, responseType: 'blob' }),
+  exportLedger: (params) => api.get('/points/my/ledger/export', { params, responseType: 'blob' }),
+};
+
+// 仪表板API
+export const dashboardAPI = {
+  getSummary: () => api.get('/dashboard/summary'),  // 聚合统计，替代轮询完整列表
 };
 
 // 文件上传API
@@ -41,6 +41,7 @@ const AdminSubmissions = () => {
     feedback: ''
   });
   const [submitting, setSubmitting] = useState(false);
+  const [reviewError, setReviewError] = useState('');
 
   // 获取提交数据
   useEffect(() => {
@@ -65,7 +66,12 @@ const AdminSubmissions = () => {
 
   const handleReviewSubmission = async (e) => {
     e.preventDefault();
+    // 已审核的提交只能查看，重新提交后回到待审核才能再次审核
+    if (selectedSubmission.review_status !== 'pending') {
+      return;
+    }
     setSubmitting(true);
+    setReviewError('');
     
     try {
       const response = await submissionsAPI.reviewSubmission(selectedSubmission.id, {
@@ -91,7 +97,24 @@ const AdminSubmissions = () => {
       setError('');
     } catch (err) {
       console.error('审核失败:', err);
-      setError(err.response?.data?.error || '审核失败，请重试');
+      setReviewError(err.response?.data?.error || '审核失败，请重试');
+      // 409：已被其他管理员审核或正被他人租用，刷新该提交，对话框随之变为只读
+      if (err.response?.status === 409) {
+        try {
+          const latest = (await submissionsAPI.getSubmission(selectedSubmission.id)).data.submission;
+          setSubmissions((prev) => prev.map(sub => sub.id === latest.id ? latest : sub));
+          setSelectedSubmission(latest);
+          if (latest.review_status !== 'pending') {
+            setReviewData({
+              status: latest.review_status,
+              awarded_points: latest.awarded_points?.toString() || '0',
+              feedback: latest.review_comments || ''
+            });
+          }
+        } catch (refreshErr) {
+          console.error('刷新提交失败:', refreshErr);
+        }
+      }
     } finally {
       setSubmitting(false);
     }
@@ -120,15 +143,15 @@ const AdminSubmissions = () => {
     );
   };
 
-  const getFileIcon = (type) => {
-    switch (type) {
-      case 'image':
-        return <Image className="h-4 w-4 text-blue-600" />;
-      case 'document':
-        return <FileText className="h-4 w-4 text-green-600" />;
-      default:
-        return <FileText className="h-4 w-4 text-gray-600" />;
+  // 附件类型来自后端返回的 content_type（如 image/png）
+  const getFileIcon = (contentType) => {
+    if (contentType?.startsWith('image/')) {
+      return <Image className="h-4 w-4 text-blue-600" />;
     }
+    if (contentType) {
+      return <FileText className="h-4 w-4 text-green-600" />;
+    }
+    return <FileText className="h-4 w-4 text-gray-600" />;
   };
 
   const formatDate = (dateString) => {
@@ -145,7 +168,7 @@ const AdminSubmissions = () => {
     try {
       // 构建下载URL
       const baseURL = import.meta.env.VITE_API_BASE_URL || 'https://staff-management-backend-gzyj.onrender.com';
-      const downloadURL = `${baseURL}/api/upload/download/${file.filename || file.path}`;
+      const downloadURL = `${baseURL}/api/upload/download/${file.name || file.filename}`;
       
       // 创建下载链接
       const link = document.createElement('a');
@@ -373,7 +396,7 @@ const AdminSubmissions = () => {
                         <div className="grid grid-cols-1 md:grid-cols-2 gap-2">
                           {submission.files.map((file, index) => (
                             <div key={index} className="flex items-center p-2 bg-gray-50 rounded-lg">
-                              {getFileIcon(file.type)}
+                              {getFileIcon(file.content_type)}
                               <div className="ml-2 flex-1 min-w-0">
                                 <p className="text-sm font-medium text-gray-900 truncate">
                                   {file.name}
@@ -415,6 +438,7 @@ const AdminSubmissions = () => {
                             awarded_points: submission.max_points?.toString() || '0',
                             feedback: ''
                           });
+                          setReviewError('');
                           setIsReviewDialogOpen(true);
                         }}
                         className="w-full bg-blue-600 hover:bg-blue-700 text-white"
@@ -433,6 +457,7 @@ const AdminSubmissions = () => {
                             awarded_points: submission.awarded_points?.toString() || '0',
                             feedback: submission.review_comments || ''
                           });
+                          setReviewError('');
                           setIsReviewDialogOpen(true);
                         }}
                         className="w-full"
@@ -479,7 +504,7 @@ const AdminSubmissions = () => {
                     <div className="mt-1 space-y-2">
                       {selectedSubmission.files.map((file, index) => (
                         <div key={index} className="flex items-center p-2 bg-gray-50 rounded-lg border">
-                          {getFileIcon(file.type || 'document')}
+                          {getFileIcon(file.content_type)}
                           <div className="ml-2 flex-1">
                             <p className="text-sm font-medium text-gray-900">
                               {file.name || file.filename || `文件${index + 1}`}
@@ -550,6 +575,13 @@ const AdminSubmissions = () => {
                 />
               </div>
               
+              {reviewError && (
+                <Alert variant="destructive">
+                  <AlertCircle className="h-4 w-4" />
+                  <AlertDescription>{reviewError}</AlertDescription>
+                </Alert>
+              )}
+              
               <DraggableDialogFooter>
                 <Button type="button" variant="outline" onClick={() => setIsReviewDialogOpen(false)}>
                   {selectedSubmission.review_status === 'pending' ? '取消' : '关闭'}
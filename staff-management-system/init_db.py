@@ -8,6 +8,9 @@ import os
 import sys
 sys.path.insert(0, os.path.dirname(__file__))
 
+# 一次性脚本：导入应用时不启动后台任务（通知清理、outbox worker）
+os.environ['BACKGROUND_JOBS'] = 'false'
+
 from src.main import app
 from src.models.user import db, User
 
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+后台维护任务（幂等，可由 cron 定期执行）
+用法：
+    python maintenance.py reconcile-notifications   为待审核提交补齐管理员通知
+    python maintenance.py recount-unread            重算每个用户的未读通知数
+    python maintenance.py purge-notifications       归档并删除超过保留期的已读通知
+    python maintenance.py rebuild-monthly-points    按积分流水重建月度积分汇总
+    python maintenance.py drain-outbox              处理所有到期的 outbox 事件（OUTBOX_WORKER=false 时使用）
+"""
+
+import os
+import sys
+sys.path.insert(0, os.path.dirname(__file__))
+
+# 一次性脚本：导入应用时不启动后台任务（通知清理、outbox worker）
+os.environ['BACKGROUND_JOBS'] = 'false'
+
+from src.main import app
+from src.models.user import db
+from src.database import maintenance
+from src.utils import outbox
+
+TASKS = {
+    'reconcile-notifications': ('补齐待审核提交通知', lambda conn: maintenance.reconcile_submission_notifications(
+        conn, **maintenance.reconcile_options(app.config))),
+    'recount-unread': ('修正未读通知计数', maintenance.recount_unread_notifications),
+    'purge-notifications': ('清理过期通知', lambda conn: maintenance.purge_notifications(
+        conn, **maintenance.notification_retention(app.config))),
+    'rebuild-monthly-points': ('重建月度积分汇总', maintenance.rebuild_monthly_points),
+    'drain-outbox': ('处理 outbox 事件', lambda conn: outbox.drain(**outbox.drain_options(app.config))),
+}
+
+def run(name):
+    label, job = TASKS[name]
+    maintenance.run_job(db.engine, label, job)
+
+if __name__ == '__main__':
+    if len(sys.argv) != 2 or sys.argv[1] not in TASKS:
+        print(__doc__)
+        sys.exit(1)
+    with app.app_context():
+        run(sys.argv[1])
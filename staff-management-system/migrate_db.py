@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+数据库迁移脚本
+用法：
+    python migrate_db.py            执行所有未执行的迁移
+    python migrate_db.py --status   查看迁移执行情况
+    python migrate_db.py --explain  检查热点查询是否命中索引
+"""
+
+import os
+import sys
+sys.path.insert(0, os.path.dirname(__file__))
+
+# 一次性脚本：导入应用时不启动后台任务（通知清理、outbox worker）
+os.environ['BACKGROUND_JOBS'] = 'false'
+
+from src.main import app
+from src.database.migrations import MIGRATIONS, applied_versions, run_migrations, explain_hot_queries
+
+def show_status():
+    done = applied_versions()
+    for m in MIGRATIONS:
+        mark = '✅' if m.version in done else '⏳'
+        print(f"{mark} {m.version:04d} {m.name}")
+
+def show_explain():
+    all_ok = True
+    for label, index_name, ok, plan in explain_hot_queries():
+        mark = '✅' if ok else '❌'
+        print(f"{mark} {label} -> {index_name}")
+        if not ok:
+            all_ok = False
+            print(f"   执行计划: {plan}")
+    return all_ok
+
+if __name__ == '__main__':
+    with app.app_context():
+        if '--status' in sys.argv:
+            show_status()
+        elif '--explain' in sys.argv:
+            sys.exit(0 if show_explain() else 1)
+        else:
+            results = run_migrations()
+            print(f"💾 本次执行 {len(results)} 个迁移")
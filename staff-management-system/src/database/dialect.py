@@ -0,0 +1,22 @@
+"""
+方言相关的写入语句
+SQLite 和 PostgreSQL 都支持 INSERT ... ON CONFLICT，但需要使用各自方言的 insert 构造
+"""
+
+from sqlalchemy import insert
+from sqlalchemy.dialects import postgresql, sqlite
+from src.models.user import db
+
+
+def dialect_name():
+    return db.session.get_bind().dialect.name
+
+
+def dialect_insert(model):
+    """返回支持 on_conflict_do_nothing / on_conflict_do_update 的 insert 构造"""
+    name = dialect_name()
+    if name == 'postgresql':
+        return postgresql.insert(model)
+    if name == 'sqlite':
+        return sqlite.insert(model)
+    return insert(model)
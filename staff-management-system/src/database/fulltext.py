@@ -0,0 +1,142 @@
+"""
+全文索引
+SQLite：FTS5 外部内容表（trigram 分词，支持中文子串匹配），由触发器与原表保持同步
+PostgreSQL：pg_trgm 扩展，每列一个 gin_trgm_ops 索引，ILIKE 子串匹配，按 similarity 排序
+两者都按子串匹配（中文不需要分词），返回 (id, rank) 子查询，rank 越小越相关，可以直接与 ORM 查询 join
+"""
+
+from sqlalchemy import text, Integer, Float
+
+# 表名 -> [(列名, 相关度权重)]，SQLite 用作 bm25 权重，PostgreSQL 用作 similarity 的加权系数
+DOCUMENTS = {
+    'task': [('title', 10.0), ('publisher_name', 5.0), ('description', 1.0)],
+    'task_submission': [('description', 1.0)],
+}
+
+# trigram 分词要求每个词至少 3 个字符，SQLite 上更短的查询退回 LIKE
+TRIGRAM_MIN_LENGTH = 3
+
+_installed = {}
+
+
+def install(conn):
+    """创建全文索引及同步触发器（幂等），由迁移调用"""
+    for table, columns in DOCUMENTS.items():
+        if conn.dialect.name == 'postgresql':
+            _install_postgresql(conn, table, columns)
+        else:
+            _install_sqlite(conn, table, columns)
+    _installed.clear()
+
+
+def _install_sqlite(conn, table, columns):
+    fts = f'{table}_fts'
+    names = [name for name, _ in columns]
+    cols = ', '.join(names)
+    new_values = ', '.join(f'new.{name}' for name in names)
+    old_values = ', '.join(f'old.{name}' for name in names)
+
+    conn.execute(text(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+        f"{cols}, content='{table}', content_rowid='id', tokenize='trigram')"
+    ))
+    conn.execute(text(
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_values}); END"
+    ))
+    conn.execute(text(
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_values}); END"
+    ))
+    conn.execute(text(
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {cols} ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_values}); "
+        f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_values}); END"
+    ))
+    # 按原表重建索引，覆盖迁移之前已有的数据
+    conn.execute(text(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')"))
+
+
+def _install_postgresql(conn, table, columns):
+    conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    for name, _ in columns:
+        conn.execute(text(
+            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_{table}_{name}_trgm "
+            f"ON {table} USING GIN ({name} gin_trgm_ops)"
+        ))
+
+
+def drop_tsvector(conn):
+    """删除旧版本的 tsvector 列、触发器和索引（'simple' 配置不能切分中文，已改用 pg_trgm）"""
+    for table in DOCUMENTS:
+        conn.execute(text(f"DROP TRIGGER IF EXISTS {table}_search_vector_trigger ON {table}"))
+        conn.execute(text(f"DROP FUNCTION IF EXISTS {table}_search_vector_update()"))
+        conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS ix_{table}_search_vector"))
+        conn.execute(text(f"ALTER TABLE {table} DROP COLUMN IF EXISTS search_vector"))
+
+
+def is_installed(session, table):
+    """检查全文索引是否已创建（结果按进程缓存）"""
+    if table not in _installed:
+        if session.get_bind().dialect.name == 'postgresql':
+            # similarity() 由 pg_trgm 提供；索引只影响速度，不影响结果
+            sql = text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        else:
+            sql = text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :table || '_fts'") \
+                .bindparams(table=table)
+        _installed[table] = session.execute(sql).first() is not None
+    return _installed[table]
+
+
+def _escape_like(term):
+    """转义 LIKE 通配符，查询词中的 % 和 _ 按字面匹配"""
+    return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def _like_subquery(table, columns, terms, operator='LIKE', rank='0.0', **params):
+    """
+    子串匹配：每个词都要在任一列中出现
+    SQLite 上是没有全文索引或查询词过短时的回退方案（LIKE 对 ASCII 不区分大小写），
+    PostgreSQL 上用 ILIKE，由 gin_trgm_ops 索引加速
+    """
+    clauses = []
+    for i, term in enumerate(terms):
+        params[f'term_{i}'] = f'%{_escape_like(term)}%'
+        clauses.append('(' + ' OR '.join(
+            f"{name} {operator} :term_{i} ESCAPE '\\'" for name, _ in columns
+        ) + ')')
+    sql = f"SELECT id, {rank} AS rank FROM {table} WHERE " + ' AND '.join(clauses)
+    return text(sql).bindparams(**params)
+
+
+def match_subquery(session, table, query):
+    """返回 (id, rank) 子查询，rank 越小越相关；查询为空时返回 None"""
+    terms = query.split()
+    if not terms:
+        return None
+
+    columns = DOCUMENTS[table]
+    dialect = session.get_bind().dialect.name
+
+    if dialect == 'postgresql':
+        if is_installed(session, table):
+            rank = '-(' + ' + '.join(f"{weight} * similarity(coalesce({name}, ''), :q)"
+                                     for name, weight in columns) + ')'
+            stmt = _like_subquery(table, columns, terms, 'ILIKE', rank, q=query)
+        else:
+            stmt = _like_subquery(table, columns, terms, 'ILIKE')
+    elif not is_installed(session, table):
+        stmt = _like_subquery(table, columns, terms)
+    elif any(len(term) < TRIGRAM_MIN_LENGTH for term in terms):
+        stmt = _like_subquery(table, columns, terms)
+    else:
+        fts = f'{table}_fts'
+        weights = ', '.join(str(weight) for _, weight in columns)
+        # 每个词作为短语加引号，多个词之间为 AND
+        match = ' '.join('"' + term.replace('"', '""') + '"' for term in terms)
+        stmt = text(
+            f"SELECT rowid AS id, bm25({fts}, {weights}) AS rank "
+            f"FROM {fts} WHERE {fts} MATCH :match"
+        ).bindparams(match=match)
+
+    return stmt.columns(id=Integer, rank=Float).subquery()
@@ -0,0 +1,208 @@
+"""
+后台维护任务
+每个任务都是幂等的集合操作，接收一个数据库连接，可以由迁移调用一次，
+也可以通过 maintenance.py 定期执行（cron / Render Cron Job）
+"""
+
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import select, literal, func, update, delete, extract, case
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import aliased
+from src.models.user import User, Task, TaskSubmission, SubmissionFile, Notification, NotificationArchive, PointRecord, MonthlyPointTotal
+
+
+def run_job(engine, label, job, log=print):
+    """执行一个维护任务并报告处理行数和耗时，返回 (行数, 耗时秒)"""
+    started = time.perf_counter()
+    with engine.connect() as conn:
+        count = job(conn)
+        conn.commit()
+    elapsed = time.perf_counter() - started
+    log(f"🔧 {label}: {count} 行 ({elapsed:.3f}s)")
+    return count, elapsed
+
+
+def _insert(conn, model):
+    if conn.dialect.name == 'postgresql':
+        return postgresql.insert(model)
+    return sqlite.insert(model)
+
+
+def reconcile_submission_notifications(conn, recount=True, submitted_after=None):
+    """
+    为每个待审核提交补齐发给每个管理员的通知（已存在的跳过）
+    已被清理任务归档的同一通知也算已存在，否则管理员早已读过的提醒会以未读状态重新出现
+    submitted_after：只处理此时间之后的提交。清理任务不归档时，早于保留期的已读通知删除后无从判断，
+    跳过这些提交以免重新生成（见 reconcile_options）
+    单条 INSERT ... SELECT ... ON CONFLICT DO NOTHING，返回新插入的行数
+    recount=False 用于未读计数列尚未创建时（早期迁移）
+    """
+    admin = aliased(User)
+    submitter = aliased(User)
+    now = datetime.utcnow()
+
+    message = literal('用户 ') + submitter.username + literal(' 提交了任务 "') + Task.title + literal('"，等待审核。')
+    rows = select(
+        admin.id,
+        literal('新的任务提交'),
+        message,
+        literal('submission_pending'),
+        literal(False),
+        literal(now),
+        literal(now),
+        TaskSubmission.task_id,
+        TaskSubmission.id,
+    ).select_from(TaskSubmission).join(
+        submitter, submitter.id == TaskSubmission.user_id
+    ).join(
+        Task, Task.id == TaskSubmission.task_id
+    ).join(
+        admin, admin.role == 'admin'
+    ).where(
+        TaskSubmission.review_status == 'pending',
+        ~select(NotificationArchive.id).where(
+            NotificationArchive.related_submission_id == TaskSubmission.id,
+            NotificationArchive.user_id == admin.id,
+            NotificationArchive.type == 'submission_pending'
+        ).exists()
+    )
+    if submitted_after is not None:
+        rows = rows.where(TaskSubmission.submitted_at >= submitted_after)
+
+    stmt = _insert(conn, Notification).from_select(
+        ['user_id', 'title', 'message', 'type', 'is_read', 'created_at', 'updated_at',
+         'related_task_id', 'related_submission_id'],
+        rows
+    ).on_conflict_do_nothing(index_elements=['user_id', 'related_submission_id', 'type'])
+    inserted = conn.execute(stmt).rowcount
+    if inserted and recount:
+        recount_unread_notifications(conn)
+    return inserted
+
+
+def recount_unread_notifications(conn):
+    """按通知表重算每个用户的未读计数，返回被修正的用户数"""
+    actual = select(func.count(Notification.id)).where(
+        Notification.user_id == User.id,
+        Notification.is_read == False
+    ).scalar_subquery()
+    stmt = update(User).where(User.unread_notification_count != actual).values(
+        unread_notification_count=actual, updated_at=User.updated_at
+    )
+    return conn.execute(stmt).rowcount
+
+
+def notification_retention(config):
+    """从应用配置读取通知保留策略"""
+    return {
+        'retention_days': config.get('NOTIFICATION_RETENTION_DAYS', 90),
+        'batch_size': config.get('NOTIFICATION_PURGE_BATCH_SIZE', 1000),
+        'archive': config.get('NOTIFICATION_ARCHIVE', True),
+    }
+
+
+def reconcile_options(config):
+    """
+    补齐通知的参数：清理任务不归档（NOTIFICATION_ARCHIVE=false）时只补齐保留期内的提交
+    通知在提交之后创建，被清理的通知对应的提交一定早于保留期的起点
+    """
+    retention = notification_retention(config)
+    if retention['archive']:
+        return {}
+    return {'submitted_after': datetime.utcnow() - timedelta(days=retention['retention_days'])}
+
+
+def purge_notifications(conn, retention_days=90, batch_size=1000, archive=True):
+    """
+    清理超过保留期的已读通知（未读通知永远保留，因此不影响未读计数）
+    每批先复制到 notification_archive（archive=True 时）再删除，每批单独提交，
+    不会长时间持有锁；返回移走的行数
+    """
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    columns = ['id', 'user_id', 'title', 'message', 'type', 'created_at',
+               'related_task_id', 'related_submission_id']
+    moved = 0
+
+    while True:
+        ids = conn.execute(
+            select(Notification.id).where(
+                Notification.is_read == True,
+                Notification.created_at < cutoff
+            ).order_by(Notification.created_at).limit(batch_size)
+        ).scalars().all()
+        if not ids:
+            break
+
+        if archive:
+            rows = select(
+                *(Notification.__table__.c[name] for name in columns), literal(datetime.utcnow())
+            ).where(Notification.id.in_(ids))
+            # 并发执行的清理任务可能处理同一批，已归档的跳过
+            conn.execute(_insert(conn, NotificationArchive).from_select(
+                columns + ['archived_at'], rows
+            ).on_conflict_do_nothing(index_elements=['id']))
+        conn.execute(delete(Notification).where(Notification.id.in_(ids), Notification.is_read == True))
+        conn.commit()
+
+        moved += len(ids)
+        if len(ids) < batch_size:
+            break
+
+    return moved
+
+
+def rebuild_monthly_points(conn):
+    """按积分流水重建月度汇总（一个事务内先清空再 INSERT ... SELECT），返回汇总行数"""
+    year = extract('year', PointRecord.created_at)
+    month = extract('month', PointRecord.created_at)
+
+    def total(point_type):
+        return func.coalesce(func.sum(case((PointRecord.type == point_type, PointRecord.points), else_=0)), 0)
+
+    rows = select(
+        year, month, PointRecord.user_id,
+        total('earned'), total('bonus'), total('deduction'),
+        literal(datetime.utcnow())
+    ).group_by(year, month, PointRecord.user_id)
+
+    conn.execute(delete(MonthlyPointTotal))
+    return conn.execute(MonthlyPointTotal.__table__.insert().from_select(
+        ['year', 'month', 'user_id', 'earned', 'bonus', 'deduction', 'updated_at'], rows
+    )).rowcount
+
+
+def backfill_submission_files(conn, batch_size=500):
+    """
+    把旧的 task_submission.file_paths JSON 拆分写入 submission_file
+    只处理还没有附件行的提交，按ID分批读取，可重复执行；返回写入的附件行数
+    """
+    from src.utils.attachments import attachment_rows, parse_file_paths
+
+    has_files = select(SubmissionFile.id).where(SubmissionFile.submission_id == TaskSubmission.id).exists()
+    last_id = 0
+    inserted = 0
+    while True:
+        batch = conn.execute(
+            select(TaskSubmission.id, TaskSubmission.file_paths).where(
+                TaskSubmission.id > last_id,
+                TaskSubmission.file_paths.isnot(None),
+                TaskSubmission.file_paths.notin_(['', '[]']),
+                ~has_files
+            ).order_by(TaskSubmission.id).limit(batch_size)
+        ).fetchall()
+        if not batch:
+            break
+
+        rows = []
+        for submission_id, raw in batch:
+            rows.extend(attachment_rows(submission_id, parse_file_paths(raw)))
+        if rows:
+            conn.execute(SubmissionFile.__table__.insert(), rows)
+            inserted += len(rows)
+
+        last_id = batch[-1][0]
+        if len(batch) < batch_size:
+            break
+
+    return inserted
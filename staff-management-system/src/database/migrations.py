@@ -0,0 +1,353 @@
+"""
+版本化数据库迁移
+db.create_all() 只会创建缺失的表，无法给已有部署加索引或加列，
+这里按版本号顺序执行迁移，并在 schema_migrations 表中记录已执行的版本。
+同时支持 SQLite 和 PostgreSQL；PostgreSQL 上的索引使用 CONCURRENTLY 在线创建，不锁写。
+"""
+
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import text, select, insert, inspect
+from sqlalchemy.exc import IntegrityError
+from src.models.user import db, SchemaMigration, User, Task, TaskSubmission, Notification, NotificationArchive, OutboxEvent, MonthlyPointTotal, SalarySnapshot, SubmissionFile
+
+MIGRATIONS = []
+
+
+class Migration:
+    def __init__(self, version, name, upgrade, online=False):
+        self.version = version
+        self.name = name
+        self.upgrade = upgrade
+        # online=True：PostgreSQL 上在事务之外执行（CREATE INDEX CONCURRENTLY 的要求）
+        self.online = online
+
+
+def migration(version, name, online=False):
+    """注册一个迁移，upgrade 函数接收一个数据库连接"""
+    def decorator(upgrade):
+        MIGRATIONS.append(Migration(version, name, upgrade, online))
+        MIGRATIONS.sort(key=lambda m: m.version)
+        return upgrade
+    return decorator
+
+
+def _declared_index(name):
+    """从模型定义中查找索引，保证迁移与模型声明一致"""
+    for table in db.metadata.tables.values():
+        for index in table.indexes:
+            if index.name == name:
+                return index
+    raise KeyError(f'模型中未声明索引: {name}')
+
+
+def create_index(conn, name):
+    """按模型声明创建索引（已存在则跳过）"""
+    index = _declared_index(name)
+    preparer = conn.dialect.identifier_preparer
+    columns = ', '.join(preparer.quote(column.name) for column in index.columns)
+    unique = 'UNIQUE ' if index.unique else ''
+    concurrently = 'CONCURRENTLY ' if conn.dialect.name == 'postgresql' else ''
+    conn.execute(text(
+        f'CREATE {unique}INDEX {concurrently}IF NOT EXISTS {preparer.quote(name)} '
+        f'ON {preparer.quote(index.table.name)} ({columns})'
+    ))
+
+
+def add_column(conn, model, column_name):
+    """按模型声明给已有表加列（已存在则跳过），返回是否新加"""
+    table = model.__table__
+    column = table.c[column_name]
+    existing = {col['name'] for col in inspect(conn).get_columns(table.name)}
+    if column_name in existing:
+        return False
+
+    preparer = conn.dialect.identifier_preparer
+    ddl = f'ALTER TABLE {preparer.quote(table.name)} ADD COLUMN {preparer.quote(column_name)} ' \
+          f'{column.type.compile(dialect=conn.dialect)}'
+    if column.server_default is not None:
+        ddl += f' DEFAULT {column.server_default.arg}'
+    if not column.nullable and column.server_default is not None:
+        ddl += ' NOT NULL'
+    conn.execute(text(ddl))
+    return True
+
+
+def applied_versions(engine=None):
+    engine = engine or db.engine
+    SchemaMigration.__table__.create(engine, checkfirst=True)
+    with engine.connect() as conn:
+        return {row[0] for row in conn.execute(select(SchemaMigration.version))}
+
+
+def run_migrations(engine=None, log=print):
+    """执行所有未执行的迁移，返回 [(版本, 名称, 耗时秒)]"""
+    engine = engine or db.engine
+    done = applied_versions(engine)
+    results = []
+
+    for m in MIGRATIONS:
+        if m.version in done:
+            continue
+
+        started = time.perf_counter()
+        if m.online and engine.dialect.name == 'postgresql':
+            with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+                m.upgrade(conn)
+        else:
+            with engine.begin() as conn:
+                m.upgrade(conn)
+
+        try:
+            with engine.begin() as conn:
+                conn.execute(insert(SchemaMigration.__table__).values(
+                    version=m.version, name=m.name, applied_at=datetime.utcnow()
+                ))
+        except IntegrityError:
+            # 其他 worker 同时执行了同一个迁移，迁移本身是幂等的
+            pass
+
+        elapsed = time.perf_counter() - started
+        results.append((m.version, m.name, elapsed))
+        log(f"🔧 迁移 {m.version:04d} {m.name} 完成 ({elapsed:.3f}s)")
+
+    return results
+
+
+# ---------------------------------------------------------------------------
+# 迁移列表
+# ---------------------------------------------------------------------------
+
+HOT_PATH_INDEXES = [
+    'ix_task_status_created_at',
+    'ix_task_assigned_to_status',
+    'ix_task_created_at_id',
+    'ix_notification_user_read_created',
+    'ix_point_record_user_created',
+    'ix_point_record_type_created',
+    'ix_task_submission_status_submitted',
+]
+
+
+@migration(1, 'hot_path_indexes', online=True)
+def _hot_path_indexes(conn):
+    for name in HOT_PATH_INDEXES:
+        create_index(conn, name)
+
+
+@migration(2, 'full_text_search', online=True)
+def _full_text_search(conn):
+    from src.database import fulltext
+    fulltext.install(conn)
+
+
+@migration(3, 'updated_at_columns')
+def _updated_at_columns(conn):
+    add_column(conn, Task, 'updated_at')
+    add_column(conn, TaskSubmission, 'updated_at')
+    add_column(conn, Notification, 'updated_at')
+    # 已有数据用最接近的时间回填
+    conn.execute(text("UPDATE task SET updated_at = created_at WHERE updated_at IS NULL"))
+    conn.execute(text(
+        "UPDATE task_submission SET updated_at = COALESCE(reviewed_at, submitted_at) "
+        "WHERE updated_at IS NULL"
+    ))
+    conn.execute(text("UPDATE notification SET updated_at = created_at WHERE updated_at IS NULL"))
+
+
+@migration(4, 'notification_unique_submission', online=True)
+def _notification_unique_submission(conn):
+    # 先清理重复的提交通知，只保留最早的一条
+    conn.execute(text(
+        "DELETE FROM notification WHERE related_submission_id IS NOT NULL AND id NOT IN ("
+        "SELECT MIN(id) FROM notification WHERE related_submission_id IS NOT NULL "
+        "GROUP BY user_id, related_submission_id, type)"
+    ))
+    create_index(conn, 'uq_notification_user_submission_type')
+
+
+@migration(5, 'admin_submission_notifications', online=True)
+def _admin_submission_notifications(conn):
+    create_index(conn, 'ix_notification_user_type_read_created')
+    # 一次性补齐历史上缺失的提交通知（原来由列表接口在 GET 时补）
+    # 补齐时要排除已归档的通知，归档表（迁移 7）需要先存在
+    NotificationArchive.__table__.create(conn, checkfirst=True)
+    from src.database.maintenance import reconcile_submission_notifications
+    reconcile_submission_notifications(conn, recount=False)
+
+
+@migration(6, 'unread_notification_count')
+def _unread_notification_count(conn):
+    add_column(conn, User, 'unread_notification_count')
+    # 对 user 表的更新会写 updated_at（迁移 17），重算计数之前先确保列存在
+    add_column(conn, User, 'updated_at')
+    from src.database.maintenance import recount_unread_notifications
+    recount_unread_notifications(conn)
+
+
+@migration(7, 'notification_retention', online=True)
+def _notification_retention(conn):
+    NotificationArchive.__table__.create(conn, checkfirst=True)
+    create_index(conn, 'ix_notification_read_created')
+
+
+@migration(8, 'notification_inbox_cursor', online=True)
+def _notification_inbox_cursor(conn):
+    create_index(conn, 'ix_notification_user_created_id')
+
+
+@migration(9, 'outbox', online=True)
+def _outbox(conn):
+    OutboxEvent.__table__.create(conn, checkfirst=True)
+    create_index(conn, 'ix_outbox_event_status_available')
+
+
+@migration(10, 'monthly_point_total')
+def _monthly_point_total(conn):
+    MonthlyPointTotal.__table__.create(conn, checkfirst=True)
+    from src.database.maintenance import rebuild_monthly_points
+    rebuild_monthly_points(conn)
+
+
+@migration(11, 'monthly_point_total_user', online=True)
+def _monthly_point_total_user(conn):
+    create_index(conn, 'ix_monthly_point_total_user')
+
+
+@migration(12, 'salary_snapshot')
+def _salary_snapshot(conn):
+    SalarySnapshot.__table__.create(conn, checkfirst=True)
+
+
+@migration(13, 'submission_list_cursor', online=True)
+def _submission_list_cursor(conn):
+    create_index(conn, 'ix_task_submission_submitted_id')
+    create_index(conn, 'ix_task_submission_user_submitted')
+    create_index(conn, 'ix_task_submission_task_submitted')
+
+
+@migration(14, 'submission_file')
+def _submission_file(conn):
+    SubmissionFile.__table__.create(conn, checkfirst=True)
+    from src.database.maintenance import backfill_submission_files
+    backfill_submission_files(conn)
+
+
+@migration(15, 'submission_review_lease')
+def _submission_review_lease(conn):
+    add_column(conn, TaskSubmission, 'leased_by')
+    add_column(conn, TaskSubmission, 'lease_expires_at')
+
+
+@migration(16, 'notification_archive_submission', online=True)
+def _notification_archive_submission(conn):
+    create_index(conn, 'ix_notification_archive_submission')
+
+
+@migration(17, 'user_updated_at')
+def _user_updated_at(conn):
+    add_column(conn, User, 'updated_at')
+    users = User.__table__
+    conn.execute(users.update().where(users.c.updated_at.is_(None)).values(updated_at=users.c.created_at))
+
+
+@migration(18, 'trigram_search', online=True)
+def _trigram_search(conn):
+    # PostgreSQL 的 'simple' tsvector 不能切分中文，改用 pg_trgm 子串匹配；SQLite 的 FTS5 trigram 不变
+    if conn.dialect.name != 'postgresql':
+        return
+    from src.database import fulltext
+    fulltext.install(conn)
+    fulltext.drop_tsvector(conn)
+
+
+# ---------------------------------------------------------------------------
+# 执行计划检查
+# ---------------------------------------------------------------------------
+
+def _hot_queries():
+    """(说明, SQL, 参数, 期望使用的索引)"""
+    since = datetime.utcnow() - timedelta(days=30)
+    return [
+        ('按状态列出任务',
+         'SELECT id FROM task WHERE status = :status ORDER BY created_at DESC LIMIT 50',
+         {'status': 'open'}, 'ix_task_status_created_at'),
+        ('我的任务',
+         'SELECT id FROM task WHERE assigned_to = :uid AND status = :status',
+         {'uid': 1, 'status': 'assigned'}, 'ix_task_assigned_to_status'),
+        ('任务游标分页',
+         'SELECT id FROM task ORDER BY created_at DESC, id DESC LIMIT 50',
+         {}, 'ix_task_created_at_id'),
+        ('未读通知',
+         'SELECT id FROM notification WHERE user_id = :uid AND is_read = :is_read '
+         'ORDER BY created_at DESC LIMIT 50',
+         {'uid': 1, 'is_read': False}, 'ix_notification_user_read_created'),
+        ('通知收件箱翻页',
+         'SELECT id FROM notification WHERE user_id = :uid AND created_at < :before '
+         'ORDER BY created_at DESC, id DESC LIMIT 50',
+         {'uid': 1, 'before': since}, 'ix_notification_user_created_id'),
+        ('待审核提交通知',
+         'SELECT id FROM notification WHERE user_id = :uid AND type = :type AND is_read = :is_read '
+         'ORDER BY created_at DESC, id DESC LIMIT 50',
+         {'uid': 1, 'type': 'submission_pending', 'is_read': False}, 'ix_notification_user_type_read_created'),
+        ('过期已读通知',
+         'SELECT id FROM notification WHERE is_read = :is_read AND created_at < :before '
+         'ORDER BY created_at LIMIT 1000',
+         {'is_read': True, 'before': since}, 'ix_notification_read_created'),
+        ('个人积分流水',
+         'SELECT id FROM point_record WHERE user_id = :uid AND created_at >= :since',
+         {'uid': 1, 'since': since}, 'ix_point_record_user_created'),
+        ('个人总积分',
+         'SELECT SUM(earned) FROM monthly_point_total WHERE user_id = :uid',
+         {'uid': 1}, 'ix_monthly_point_total_user'),
+        ('按类型的积分统计',
+         'SELECT SUM(points) FROM point_record WHERE type = :type AND created_at >= :since',
+         {'type': 'earned', 'since': since}, 'ix_point_record_type_created'),
+        ('待审核提交',
+         'SELECT id FROM task_submission WHERE review_status = :status '
+         'ORDER BY submitted_at DESC LIMIT 50',
+         {'status': 'pending'}, 'ix_task_submission_status_submitted'),
+        ('提交列表翻页',
+         'SELECT id FROM task_submission ORDER BY submitted_at DESC, id DESC LIMIT 50',
+         {}, 'ix_task_submission_submitted_id'),
+        ('我的提交',
+         'SELECT id FROM task_submission WHERE user_id = :uid '
+         'ORDER BY submitted_at DESC, id DESC LIMIT 50',
+         {'uid': 1}, 'ix_task_submission_user_submitted'),
+        ('引用文件的提交',
+         'SELECT submission_id FROM submission_file WHERE path = :path',
+         {'path': '/uploads/example.png'}, 'ix_submission_file_path'),
+        ('任务的提交',
+         'SELECT id FROM task_submission WHERE task_id = :tid '
+         'ORDER BY submitted_at DESC, id DESC LIMIT 50',
+         {'tid': 1}, 'ix_task_submission_task_submitted'),
+    ]
+
+
+def explain_hot_queries(engine=None):
+    """
+    对热点查询执行 EXPLAIN，检查是否选中了对应的索引
+    返回 [(说明, 期望索引, 是否命中, 执行计划文本)]
+    PostgreSQL 上小表会倾向顺序扫描，因此在检查期间关闭 enable_seqscan
+    """
+    engine = engine or db.engine
+    dialect = engine.dialect.name
+    results = []
+
+    with engine.connect() as conn:
+        trans = conn.begin()
+        try:
+            if dialect == 'postgresql':
+                conn.execute(text('SET LOCAL enable_seqscan = off'))
+                prefix = 'EXPLAIN '
+            else:
+                prefix = 'EXPLAIN QUERY PLAN '
+
+            for label, sql, params, index_name in _hot_queries():
+                rows = conn.execute(text(prefix + sql), params).fetchall()
+                plan = '\n'.join(' '.join(str(col) for col in row) for row in rows)
+                results.append((label, index_name, index_name in plan, plan))
+        finally:
+            trans.rollback()
+
+    return results
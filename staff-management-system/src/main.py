@@ -3,7 +3,7 @@ import sys
 # DON'T CHANGE THIS !!!
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
-from flask import Flask, send_from_directory, jsonify
+from flask import Flask, send_from_directory, jsonify, request
 from flask_jwt_extended import JWTManager
 from flask_cors import CORS
 from datetime import timedelta
@@ -16,6 +16,8 @@ from src.routes.submissions import submissions_bp
 from src.routes.points import points_bp
 from src.routes.upload import upload_bp
 from src.routes.notifications import notifications_bp
+from src.routes.dashboard import dashboard_bp
+from src.routes.search import search_bp
 
 app = Flask(__name__)
 
@@ -63,13 +65,55 @@ else:
 app.config['SQLALCHEMY_DATABASE_URI'] = DATABASE_URL
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
+# 仪表板汇总缓存时间（秒），写入时会自动失效
+app.config['DASHBOARD_CACHE_TTL'] = int(os.getenv('DASHBOARD_CACHE_TTL', 30))
+
+# 积分趋势缓存时间（秒），积分写入时会自动失效
+app.config['POINTS_TIMESERIES_CACHE_TTL'] = int(os.getenv('POINTS_TIMESERIES_CACHE_TTL', 300))
+
+# 通知推送（SSE）单个连接的最长时间（秒），到期后客户端自动重连
+app.config['NOTIFICATION_STREAM_MAX_SECONDS'] = int(os.getenv('NOTIFICATION_STREAM_MAX_SECONDS', 300))
+# 推送令牌有效期（秒）：只用于建立连接，每次连接前重新签发
+app.config['NOTIFICATION_STREAM_TOKEN_SECONDS'] = int(os.getenv('NOTIFICATION_STREAM_TOKEN_SECONDS', 60))
+# 每个 worker 同时保持的推送连接上限：每个连接占用一个 gthread 线程，其余线程留给普通请求
+app.config['NOTIFICATION_STREAM_MAX_CONNECTIONS'] = int(os.getenv('NOTIFICATION_STREAM_MAX_CONNECTIONS', 16))
+
+# 通知保留策略：超过保留天数的已读通知归档到 notification_archive 后删除
+app.config['NOTIFICATION_RETENTION_DAYS'] = int(os.getenv('NOTIFICATION_RETENTION_DAYS', 90))
+app.config['NOTIFICATION_PURGE_BATCH_SIZE'] = int(os.getenv('NOTIFICATION_PURGE_BATCH_SIZE', 1000))
+app.config['NOTIFICATION_ARCHIVE'] = os.getenv('NOTIFICATION_ARCHIVE', 'true').lower() == 'true'
+app.config['NOTIFICATION_PURGE_INTERVAL_HOURS'] = float(os.getenv('NOTIFICATION_PURGE_INTERVAL_HOURS', 24))  # 0 表示不在进程内执行
+
+# outbox：事务提交后的副作用（通知等）由后台 worker 分批处理
+app.config['OUTBOX_WORKER'] = os.getenv('OUTBOX_WORKER', 'true').lower() == 'true'  # false：改用 maintenance.py drain-outbox 单独执行
+app.config['OUTBOX_BATCH_SIZE'] = int(os.getenv('OUTBOX_BATCH_SIZE', 100))
+app.config['OUTBOX_MAX_ATTEMPTS'] = int(os.getenv('OUTBOX_MAX_ATTEMPTS', 8))
+app.config['OUTBOX_POLL_SECONDS'] = float(os.getenv('OUTBOX_POLL_SECONDS', 5))
+
+# 后台任务（通知清理、outbox worker）只在服务进程中启动；maintenance.py 等一次性脚本导入前设为 false
+app.config['BACKGROUND_JOBS'] = os.getenv('BACKGROUND_JOBS', 'true').lower() == 'true'
+
+# 审核工作队列：/submissions/next 的租约时长（秒）和单次最多领取的提交数
+app.config['SUBMISSION_LEASE_SECONDS'] = int(os.getenv('SUBMISSION_LEASE_SECONDS', 600))
+app.config['SUBMISSION_LEASE_MAX_ITEMS'] = int(os.getenv('SUBMISSION_LEASE_MAX_ITEMS', 20))
+
 # 文件上传配置
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+app.config['TASK_IMPORT_MAX_CONTENT_LENGTH'] = 512 * 1024 * 1024  # 批量导入任务文件上限（流式读取）
 
 # 初始化扩展
 db.init_app(app)
 jwt = JWTManager(app)
 
+# 通知推送中心（PostgreSQL 上通过 LISTEN/NOTIFY 跨 worker 广播）
+from src.utils.pubsub import notification_hub
+with app.app_context():
+    notification_hub.init_app(db.engine)
+
+# 提交了 outbox 事件的事务结束后唤醒后台 worker
+from src.utils.outbox import outbox_worker, install_session_hooks as install_outbox_hooks
+install_outbox_hooks(db.session)
+
 # JWT identity loader - 确保正确处理用户ID
 @jwt.user_identity_loader
 def user_identity_lookup(user):
@@ -94,6 +138,15 @@ def invalid_token_callback(error):
 def missing_token_callback(error):
     return jsonify({'error': '需要访问令牌'}), 401
 
+# 带 scope 的令牌（通知推送令牌）只能用于对应的接口，不能当作普通访问令牌
+@jwt.token_verification_loader
+def verify_token_scope(jwt_header, jwt_payload):
+    return 'scope' not in jwt_payload or request.endpoint == 'notifications.stream_notifications'
+
+@jwt.token_verification_failed_loader
+def token_scope_failed_callback(jwt_header, jwt_payload):
+    return jsonify({'error': '令牌不能用于此接口'}), 401
+
 # 配置CORS - 使用Flask-CORS扩展，避免多重头冲突
 CORS(app, 
      origins=['*'],  # 允许所有来源
@@ -110,6 +163,8 @@ app.register_blueprint(submissions_bp, url_prefix='/api')
 app.register_blueprint(points_bp, url_prefix='/api')
 app.register_blueprint(upload_bp, url_prefix='/api')
 app.register_blueprint(notifications_bp, url_prefix='/api')
+app.register_blueprint(dashboard_bp, url_prefix='/api')
+app.register_blueprint(search_bp, url_prefix='/api')
 
 # 数据库初始化
 def init_database():
@@ -119,6 +174,10 @@ def init_database():
             db.create_all()
             print("✅ 数据库表创建完成")
             
+            # 执行版本化迁移（给已有部署补索引等）
+            from src.database.migrations import run_migrations
+            run_migrations()
+            
             # 自动创建初始账户
             from src.models.user import User
             
@@ -143,6 +202,25 @@ def init_database():
 # 在应用启动时初始化数据库
 init_database()
 
+# 后台维护任务
+def start_background_jobs():
+    from src.utils.scheduler import start_periodic
+    from src.database import maintenance
+    
+    interval_hours = app.config['NOTIFICATION_PURGE_INTERVAL_HOURS']
+    if interval_hours > 0:
+        def purge():
+            with app.app_context():
+                maintenance.run_job(db.engine, '清理过期通知', lambda conn: maintenance.purge_notifications(
+                    conn, **maintenance.notification_retention(app.config)))
+        start_periodic('notification-retention', interval_hours * 3600, purge)
+    
+    if app.config['OUTBOX_WORKER']:
+        outbox_worker.start(app)
+
+if app.config['BACKGROUND_JOBS']:
+    start_background_jobs()
+
 @app.route('/')
 def health_check():
     return jsonify({
@@ -12,6 +12,9 @@ class User(db.Model):
     role = db.Column(db.String(20), default='user')  # 'user' or 'admin'
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     total_points = db.Column(db.Integer, default=0)
+    unread_notification_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # 冗余计数，见 utils/unread.py
+    # 用于列表 ETag（列表中展示用户名）；计数类字段的集合更新不修改它
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # 关系
     created_tasks = db.relationship('Task', foreign_keys='Task.created_by', backref='creator', lazy='dynamic')
@@ -47,15 +50,30 @@ class Task(db.Model):
     start_date = db.Column(db.Date, nullable=False)
     end_date = db.Column(db.Date, nullable=False)
     max_points = db.Column(db.Integer, nullable=False)
-    status = db.Column(db.String(20), default='open')  # 'open', 'assigned', 'submitted', 'completed', 'cancelled'
+    status = db.Column(db.String(20), default='open')  # 'open', 'assigned', 'submitted', 'completed', 'cancelled', 'archived'
     created_by = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     assigned_to = db.Column(db.Integer, db.ForeignKey('user.id'))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)  # 用于 ETag
 
     # 关系
     submissions = db.relationship('TaskSubmission', backref='task', lazy='dynamic')
 
-    def to_dict(self):
+    # 热点查询索引：状态筛选+时间排序、我的任务、游标分页
+    __table_args__ = (
+        db.Index('ix_task_status_created_at', 'status', 'created_at'),
+        db.Index('ix_task_assigned_to_status', 'assigned_to', 'status'),
+        db.Index('ix_task_created_at_id', 'created_at', 'id'),
+    )
+
+    def to_dict(self, user_names=None):
+        """user_names: 预加载的 {用户ID: 用户名}，传入时不再懒加载 creator/assignee"""
+        if user_names is None:
+            creator_name = self.creator.username if self.creator else None
+            assignee_name = self.assignee.username if self.assignee else None
+        else:
+            creator_name = user_names.get(self.created_by)
+            assignee_name = user_names.get(self.assigned_to)
         return {
             'id': self.id,
             'title': self.title,
@@ -68,8 +86,8 @@ class Task(db.Model):
             'created_by': self.created_by,
             'assigned_to': self.assigned_to,
             'created_at': self.created_at.isoformat() if self.created_at else None,
-            'creator_name': self.creator.username if self.creator else None,
-            'assignee_name': self.assignee.username if self.assignee else None
+            'creator_name': creator_name,
+            'assignee_name': assignee_name
         }
 
 class TaskSubmission(db.Model):
@@ -77,35 +95,105 @@ class TaskSubmission(db.Model):
     task_id = db.Column(db.Integer, db.ForeignKey('task.id'), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     description = db.Column(db.Text)
-    file_paths = db.Column(db.Text)  # JSON格式存储文件路径
+    # 已废弃：附件保存在 submission_file 表，此列只保留给迁移回填历史数据，不再读写
+    file_paths = db.deferred(db.Column(db.Text))
     submitted_at = db.Column(db.DateTime, default=datetime.utcnow)
     reviewed_at = db.Column(db.DateTime)
     awarded_points = db.Column(db.Integer, default=0)
     review_status = db.Column(db.String(20), default='pending')  # 'pending', 'approved', 'rejected'
     review_comments = db.Column(db.Text)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)  # 用于 ETag
+    # 审核租约：正在审核此提交的管理员和租约到期时间，见 utils/review_lease.py
+    leased_by = db.Column(db.Integer)  # 管理员用户ID（不加外键，避免与 user_id 的关系产生歧义）
+    lease_expires_at = db.Column(db.DateTime)
 
-    def to_dict(self):
-        import json
-        try:
-            files = json.loads(self.file_paths) if self.file_paths else []
-        except:
-            files = []
+    # 列表中延迟加载的大字段，只在详情中返回
+    DETAIL_COLUMNS = ('description', 'review_comments')
+
+    # 待审核队列：按审核状态筛选+提交时间排序；其余索引用于按提交时间游标分页（全部/按用户/按任务）
+    __table_args__ = (
+        db.Index('ix_task_submission_status_submitted', 'review_status', 'submitted_at'),
+        db.Index('ix_task_submission_submitted_id', 'submitted_at', 'id'),
+        db.Index('ix_task_submission_user_submitted', 'user_id', 'submitted_at', 'id'),
+        db.Index('ix_task_submission_task_submitted', 'task_id', 'submitted_at', 'id'),
+    )
+
+    def to_dict(self, task_info=None, user_names=None, detail=True, files=None):
+        """
+        task_info: 预加载的 {任务ID: (标题, 最大积分)}
+        user_names: 预加载的 {用户ID: 用户名}
+        files: 预加载的 {提交ID: [附件字典]}
+        传入时不再懒加载 task/user/files
+        detail=False 时不包含说明和审核意见（列表视图，这些列没有加载）
+        """
+        if task_info is None:
+            task_title = self.task.title if self.task else None
+            max_points = self.task.max_points if self.task else 0
+        else:
+            task_title, max_points = task_info.get(self.task_id, (None, 0))
+        
+        if user_names is None:
+            user_name = self.user.username if self.user else None
+        else:
+            user_name = user_names.get(self.user_id)
+        
+        if files is None:
+            attachments = [attachment.to_dict() for attachment in self.files]
+        else:
+            attachments = files.get(self.id, [])
             
-        return {
+        data = {
             'id': self.id,
             'task_id': self.task_id,
             'user_id': self.user_id,
-            'description': self.description,
-            'files': files,  # 解析后的文件数组
-            'file_paths': self.file_paths,  # 保留原始JSON字符串
             'submitted_at': self.submitted_at.isoformat() if self.submitted_at else None,
             'reviewed_at': self.reviewed_at.isoformat() if self.reviewed_at else None,
             'awarded_points': self.awarded_points,
             'review_status': self.review_status,
-            'review_comments': self.review_comments,
-            'task_title': self.task.title if self.task else None,
-            'user_name': self.user.username if self.user else None,
-            'max_points': self.task.max_points if self.task else 0  # 添加最大积分
+            'task_title': task_title,
+            'user_name': user_name,
+            'max_points': max_points,  # 添加最大积分
+            'files': attachments,  # 附件元数据
+            'leased_by': self.leased_by,
+            'lease_expires_at': self.lease_expires_at.isoformat() if self.lease_expires_at else None
+        }
+        if not detail:
+            return data
+        
+        data.update({
+            'description': self.description,
+            'review_comments': self.review_comments
+        })
+        return data
+
+class SubmissionFile(db.Model):
+    """提交的附件，每个文件一行，见 utils/attachments.py"""
+    __tablename__ = 'submission_file'
+
+    id = db.Column(db.Integer, primary_key=True)
+    submission_id = db.Column(db.Integer, db.ForeignKey('task_submission.id'), nullable=False)
+    path = db.Column(db.String(500), nullable=False)  # 上传接口返回的路径，如 /uploads/xxx.png
+    size = db.Column(db.Integer)  # 字节数，文件不在本机时为空
+    content_type = db.Column(db.String(100))
+    sha256 = db.Column(db.String(64))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    submission = db.relationship('TaskSubmission', backref=db.backref('files', order_by='SubmissionFile.id'))
+
+    # 按提交加载附件；按路径反查引用了某个文件的提交
+    __table_args__ = (
+        db.Index('ix_submission_file_submission', 'submission_id'),
+        db.Index('ix_submission_file_path', 'path'),
+    )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'path': self.path,
+            'name': self.path.rsplit('/', 1)[-1],
+            'size': self.size,
+            'content_type': self.content_type,
+            'sha256': self.sha256
         }
 
 class Notification(db.Model):
@@ -116,9 +204,23 @@ class Notification(db.Model):
     type = db.Column(db.String(50), default='info')  # 'info', 'success', 'warning', 'error'
     is_read = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)  # 用于 ETag
     related_task_id = db.Column(db.Integer, db.ForeignKey('task.id'))
     related_submission_id = db.Column(db.Integer, db.ForeignKey('task_submission.id'))
 
+    # 未读通知查询：用户+已读状态+时间排序
+    # 同一用户、同一提交、同一类型的通知只保留一条（批量插入时 ON CONFLICT DO NOTHING）
+    __table_args__ = (
+        db.Index('ix_notification_user_read_created', 'user_id', 'is_read', 'created_at'),
+        # 收件箱游标分页（before/after/since_id）
+        db.Index('ix_notification_user_created_id', 'user_id', 'created_at', 'id'),
+        # 管理员待审核提交通知列表：按类型筛选后游标分页
+        db.Index('ix_notification_user_type_read_created', 'user_id', 'type', 'is_read', 'created_at', 'id'),
+        # 保留期清理：按已读状态+时间查找过期通知
+        db.Index('ix_notification_read_created', 'is_read', 'created_at'),
+        db.Index('uq_notification_user_submission_type', 'user_id', 'related_submission_id', 'type', unique=True),
+    )
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -132,6 +234,25 @@ class Notification(db.Model):
             'related_submission_id': self.related_submission_id
         }
 
+class NotificationArchive(db.Model):
+    """归档（冷）通知：超过保留期的已读通知移到这里，不参与在线查询"""
+    __tablename__ = 'notification_archive'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)  # 沿用原通知ID
+    user_id = db.Column(db.Integer, nullable=False)
+    title = db.Column(db.String(200), nullable=False)
+    message = db.Column(db.Text, nullable=False)
+    type = db.Column(db.String(50))
+    created_at = db.Column(db.DateTime)
+    related_task_id = db.Column(db.Integer)
+    related_submission_id = db.Column(db.Integer)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    # 补齐提交通知时判断是否已归档
+    __table_args__ = (
+        db.Index('ix_notification_archive_submission', 'related_submission_id', 'user_id', 'type'),
+    )
+
 class MonthlySetting(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     year = db.Column(db.Integer, nullable=False)
@@ -156,6 +277,38 @@ class MonthlySetting(db.Model):
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
 
+class MonthlyPointTotal(db.Model):
+    """每个用户每月各类型积分的汇总，随积分记录在同一事务中维护，见 utils/monthly_points.py"""
+    __tablename__ = 'monthly_point_total'
+
+    # 主键以年月开头：按月读取所有用户是一次主键范围扫描
+    year = db.Column(db.Integer, primary_key=True)
+    month = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    earned = db.Column(db.Integer, nullable=False, default=0)
+    bonus = db.Column(db.Integer, nullable=False, default=0)
+    deduction = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    # 个人总积分：按用户读取所有月份
+    __table_args__ = (
+        db.Index('ix_monthly_point_total_user', 'user_id'),
+    )
+
+class SalarySnapshot(db.Model):
+    """月度确认时冻结的每个用户的积分和工资，已确认月份只读取这里"""
+    __tablename__ = 'salary_snapshot'
+
+    year = db.Column(db.Integer, primary_key=True)
+    month = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, primary_key=True)
+    username = db.Column(db.String(50), nullable=False)
+    email = db.Column(db.String(100))
+    monthly_points = db.Column(db.Integer, nullable=False, default=0)
+    share = db.Column(db.Numeric(10, 8), nullable=False, default=0)  # 占当月总积分的比例
+    salary = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
 class PointRecord(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
@@ -165,6 +318,12 @@ class PointRecord(db.Model):
     description = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    # 个人积分流水和按类型的月度统计
+    __table_args__ = (
+        db.Index('ix_point_record_user_created', 'user_id', 'created_at'),
+        db.Index('ix_point_record_type_created', 'type', 'created_at'),
+    )
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -176,3 +335,28 @@ class PointRecord(db.Model):
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
 
+class OutboxEvent(db.Model):
+    """待处理的事务后副作用（通知等），见 utils/outbox.py"""
+    __tablename__ = 'outbox_event'
+
+    id = db.Column(db.Integer, primary_key=True)
+    topic = db.Column(db.String(50), nullable=False)
+    payload = db.Column(db.Text, nullable=False)  # JSON
+    status = db.Column(db.String(20), nullable=False, default='pending')  # 'pending', 'failed'
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    available_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)  # 下一次可处理的时间（重试退避）
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    # worker 领取到期事件
+    __table_args__ = (
+        db.Index('ix_outbox_event_status_available', 'status', 'available_at', 'id'),
+    )
+
+class SchemaMigration(db.Model):
+    """已执行的数据库迁移版本"""
+    __tablename__ = 'schema_migrations'
+
+    version = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(200), nullable=False)
+    applied_at = db.Column(db.DateTime, default=datetime.utcnow)
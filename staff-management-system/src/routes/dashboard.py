@@ -0,0 +1,93 @@
+from flask import Blueprint, jsonify, current_app
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from datetime import datetime
+from sqlalchemy import func
+from src.models.user import db, User, Task, TaskSubmission, PointRecord, Notification
+from src.utils.cache import TTLCache, invalidate_on_write
+
+dashboard_bp = Blueprint('dashboard', __name__)
+
+# 仪表板汇总缓存：任何相关写入都会清空，TTL 只作为兜底
+summary_cache = TTLCache(ttl=30)
+invalidate_on_write(db.session, summary_cache, (User, Task, TaskSubmission, PointRecord, Notification))
+
+def _status_counts(query):
+    """按状态统计任务数量"""
+    rows = query.with_entities(Task.status, func.count(Task.id)).group_by(Task.status).all()
+    return {status: count for status, count in rows}
+
+def _admin_summary(user):
+    """管理员汇总：任务状态分布、用户数、待审核数"""
+    task_status_counts = _status_counts(Task.query)
+
+    role_rows = db.session.query(User.role, func.count(User.id)).group_by(User.role).all()
+    role_counts = {role: count for role, count in role_rows}
+    total_users = sum(role_counts.values())
+    admin_users = role_counts.get('admin', 0)
+
+    pending_reviews = TaskSubmission.query.filter_by(review_status='pending').count()
+
+    return {
+        'role': 'admin',
+        'total_tasks': sum(task_status_counts.values()),
+        'task_status_counts': task_status_counts,
+        'total_users': total_users,
+        'admin_users': admin_users,
+        'regular_users': total_users - admin_users,
+        'pending_reviews': pending_reviews,
+        'unread_count': user.unread_notification_count
+    }
+
+def _user_summary(user):
+    """员工汇总：我的任务分布、可接任务数、本月积分、未读数"""
+    my_status_counts = _status_counts(Task.query.filter_by(assigned_to=user.id))
+    open_tasks = Task.query.filter_by(status='open').count()
+
+    # 按月初时间做范围过滤，可以走 (user_id, created_at) 索引
+    month_start = datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    month_points = db.session.query(func.coalesce(func.sum(PointRecord.points), 0)).filter(
+        PointRecord.user_id == user.id,
+        PointRecord.type == 'earned',
+        PointRecord.created_at >= month_start
+    ).scalar()
+
+    return {
+        'role': user.role,
+        'total_tasks': sum(my_status_counts.values()),
+        'task_status_counts': my_status_counts,
+        'open_tasks': open_tasks,
+        'total_points': user.total_points or 0,
+        'month_points': int(month_points or 0),
+        'unread_count': user.unread_notification_count
+    }
+
+@dashboard_bp.route('/dashboard/summary', methods=['GET'])
+@jwt_required()
+def get_dashboard_summary():
+    """仪表板汇总数据（聚合查询 + 短时缓存），替代轮询完整列表"""
+    try:
+        user_id = get_jwt_identity()
+
+        # 确保用户ID是整数类型用于数据库查询
+        if isinstance(user_id, str):
+            try:
+                user_id_int = int(user_id)
+            except ValueError:
+                return jsonify({'error': '无效的用户ID格式'}), 400
+        else:
+            user_id_int = user_id
+
+        user = User.query.get(user_id_int)
+        if not user:
+            return jsonify({'error': '用户不存在'}), 404
+
+        ttl = current_app.config.get('DASHBOARD_CACHE_TTL', summary_cache.ttl)
+        if user.role == 'admin':
+            summary = summary_cache.get_or_compute(('admin', user.id), lambda: _admin_summary(user), ttl)
+        else:
+            summary = summary_cache.get_or_compute(('user', user.id), lambda: _user_summary(user), ttl)
+
+        return jsonify(summary), 200
+
+    except Exception as e:
+        return jsonify({'error': f'获取仪表板数据失败: {str(e)}'}), 500
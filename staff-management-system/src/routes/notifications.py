@@ -1,11 +1,36 @@
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from datetime import datetime
+from flask import Blueprint, request, jsonify, Response, current_app
+from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt, create_access_token
+from datetime import datetime, timedelta
+import json
+import queue
+import threading
+import time
+from collections import Counter
 from src.models.user import db, User, Notification, Task, TaskSubmission
+from src.utils.serializers import serialize_notifications, load_user_names, load_task_info
+from src.database.dialect import dialect_insert
+from src.utils.conditional import query_fingerprint, request_etag, is_not_modified, not_modified_response, conditional_json
+from src.utils.pagination import parse_limit, keyset_page, keyset_filter, encode_cursor
+from src.utils.unread import unread_count, adjust_unread_counts, unread_deltas
+from src.utils.outbox import outbox_handler
+from src.utils.pubsub import notification_hub, install_session_hooks, queue_event
 from functools import wraps
 
 notifications_bp = Blueprint('notifications', __name__)
 
+# 通知写入提交后推送给在线的 SSE 连接
+install_session_hooks(db.session, Notification)
+
+# SSE 心跳间隔（秒），用于保持代理连接并及时发现断开的客户端
+STREAM_HEARTBEAT_SECONDS = 15
+
+# 推送令牌的 scope：只能用于建立 SSE 连接，普通接口拒绝（见 main.py 的 token_verification_loader）
+STREAM_TOKEN_SCOPE = 'notification_stream'
+
+# 本进程当前的推送连接数，每个连接占用一个 gthread 线程
+_stream_lock = threading.Lock()
+_stream_connections = 0
+
 def require_admin(f):
     """装饰器：要求管理员权限"""
     @wraps(f)
@@ -30,7 +55,10 @@ def require_admin(f):
 @notifications_bp.route('/notifications', methods=['GET'])
 @jwt_required()
 def get_notifications():
-    """获取当前用户的通知"""
+    """
+    获取当前用户的通知，按 (created_at, id) 倒序
+    before=<游标>：翻到更早的一页；after=<游标> 或 since_id=<通知ID>：只返回客户端还没有的新通知
+    """
     try:
         user_id = get_jwt_identity()
         
@@ -49,18 +77,72 @@ def get_notifications():
 
         # 获取查询参数
         unread_only = request.args.get('unread_only', 'false').lower() == 'true'
-        limit = request.args.get('limit', 50, type=int)
+        limit = parse_limit(request.args.get('limit'))
+        before = request.args.get('before')
+        after = request.args.get('after')
+        since_id = request.args.get('since_id', type=int)
+        newer = after is not None or since_id is not None
         
         query = Notification.query.filter_by(user_id=user_id_int)
         
         if unread_only:
             query = query.filter_by(is_read=False)
         
-        notifications = query.order_by(Notification.created_at.desc()).limit(limit).all()
+        try:
+            if before:
+                query = query.filter(keyset_filter(Notification.created_at, Notification.id, before))
+            if after:
+                query = query.filter(keyset_filter(Notification.created_at, Notification.id, after, newer=True))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        return jsonify({
-            'notifications': [notification.to_dict() for notification in notifications]
-        }), 200
+        if since_id is not None:
+            # 转换为 (created_at, id) 游标，走同一个索引；通知已被清理时退回按 ID 比较
+            anchor = db.session.query(Notification.created_at).filter_by(
+                id=since_id, user_id=user_id_int
+            ).scalar()
+            if anchor is not None:
+                query = query.filter(keyset_filter(
+                    Notification.created_at, Notification.id, encode_cursor(anchor, since_id), newer=True
+                ))
+            else:
+                query = query.filter(Notification.id > since_id)
+        
+        # 取新通知时从游标往后正序取，保证不跳过任何一条
+        if newer:
+            query = query.order_by(Notification.created_at.asc(), Notification.id.asc())
+        else:
+            query = query.order_by(Notification.created_at.desc(), Notification.id.desc())
+        query = query.limit(limit + 1)
+        
+        # 条件 GET：数据没有变化时直接返回 304
+        count, last_modified, id_sum = query_fingerprint(query, Notification.id, Notification.updated_at)
+        etag = request_etag(user_id_int, count, last_modified, id_sum)
+        if is_not_modified(etag):
+            return not_modified_response(etag, last_modified)
+        
+        notifications = query.all()
+        has_more = len(notifications) > limit
+        notifications = notifications[:limit]
+        
+        next_cursor = None
+        newer_cursor = after
+        if newer:
+            if notifications:
+                newer_cursor = encode_cursor(notifications[-1].created_at, notifications[-1].id)
+            notifications.reverse()
+        else:
+            if notifications:
+                newer_cursor = encode_cursor(notifications[0].created_at, notifications[0].id)
+            if has_more:
+                next_cursor = encode_cursor(notifications[-1].created_at, notifications[-1].id)
+        
+        return conditional_json({
+            'notifications': serialize_notifications(notifications),
+            'next_cursor': next_cursor,  # 更早一页：before=next_cursor
+            'newer_cursor': newer_cursor,  # 之后的新通知：after=newer_cursor
+            'has_more': has_more
+        }, etag, last_modified)
         
     except Exception as e:
         return jsonify({'error': f'获取通知失败: {str(e)}'}), 500
@@ -81,22 +163,122 @@ def get_notification_count():
         else:
             user_id_int = user_id
 
-        user = User.query.get(user_id_int)
-        if not user:
+        # 单次主键读取冗余计数
+        count = unread_count(user_id_int)
+        if count is None:
             return jsonify({'error': '用户不存在'}), 404
-
-        unread_count = Notification.query.filter_by(
-            user_id=user_id_int, 
-            is_read=False
-        ).count()
         
         return jsonify({
-            'unread_count': unread_count
+            'unread_count': count
         }), 200
         
     except Exception as e:
         return jsonify({'error': f'获取通知数量失败: {str(e)}'}), 500
 
+def _sse(event_name, data):
+    return f"event: {event_name}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+def _acquire_stream_slot(limit):
+    """占用一个推送连接名额，已满时返回 False"""
+    global _stream_connections
+    with _stream_lock:
+        if _stream_connections >= limit:
+            return False
+        _stream_connections += 1
+        return True
+
+def _release_stream_slot():
+    global _stream_connections
+    with _stream_lock:
+        _stream_connections -= 1
+
+@notifications_bp.route('/notifications/stream-token', methods=['POST'])
+@jwt_required()
+def create_stream_token():
+    """签发建立通知推送连接用的短期令牌（EventSource 无法设置请求头，令牌只能放在地址里）"""
+    expires_in = current_app.config.get('NOTIFICATION_STREAM_TOKEN_SECONDS', 60)
+    token = create_access_token(
+        identity=get_jwt_identity(),
+        expires_delta=timedelta(seconds=expires_in),
+        additional_claims={'scope': STREAM_TOKEN_SCOPE}
+    )
+    return jsonify({'token': token, 'expires_in': expires_in}), 200
+
+@notifications_bp.route('/notifications/stream', methods=['GET'])
+@jwt_required(locations=['query_string'])
+def stream_notifications():
+    """通知推送（Server-Sent Events），只接受 /notifications/stream-token 签发的令牌（?jwt=）"""
+    if get_jwt().get('scope') != STREAM_TOKEN_SCOPE:
+        return jsonify({'error': '需要通知推送令牌'}), 401
+    
+    user_id = get_jwt_identity()
+    
+    # 确保用户ID是整数类型用于数据库查询
+    if isinstance(user_id, str):
+        try:
+            user_id_int = int(user_id)
+        except ValueError:
+            return jsonify({'error': '无效的用户ID格式'}), 400
+    else:
+        user_id_int = user_id
+    
+    app = current_app._get_current_object()
+    max_seconds = app.config.get('NOTIFICATION_STREAM_MAX_SECONDS', 300)
+    # 连接数到上限时拒绝，避免推送连接占满线程池、普通请求排队
+    if not _acquire_stream_slot(app.config.get('NOTIFICATION_STREAM_MAX_CONNECTIONS', 16)):
+        return jsonify({'error': '推送连接数已满，请稍后重试'}), 503, {'Retry-After': '30'}
+    
+    try:
+        initial_count = unread_count(user_id_int) or 0
+    except Exception:
+        _release_stream_slot()
+        raise
+    subscriber = notification_hub.subscribe(user_id_int)
+    
+    def generate():
+        try:
+            yield 'retry: 3000\n\n'
+            yield _sse('unread_count', {'unread_count': initial_count})
+            
+            deadline = time.monotonic() + max_seconds
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                # 空闲时只阻塞在队列上，不占用数据库连接
+                try:
+                    events = [subscriber.get(timeout=min(STREAM_HEARTBEAT_SECONDS, remaining))]
+                except queue.Empty:
+                    yield ': keep-alive\n\n'
+                    continue
+                
+                # 合并同一时间到达的多个事件，只查询一次未读数
+                while True:
+                    try:
+                        events.append(subscriber.get_nowait())
+                    except queue.Empty:
+                        break
+                
+                with app.app_context():
+                    notification_ids = [e['id'] for e in events if e.get('type') == 'notification']
+                    if notification_ids:
+                        new_notifications = Notification.query.filter(
+                            Notification.id.in_(notification_ids)
+                        ).order_by(Notification.created_at).all()
+                        for notification in new_notifications:
+                            yield _sse('notification', notification.to_dict())
+                    yield _sse('unread_count', {'unread_count': unread_count(user_id_int) or 0})
+        finally:
+            notification_hub.unsubscribe(user_id_int, subscriber)
+    
+    response = Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'  # 关闭反向代理缓冲
+    })
+    # 生成器可能还没开始迭代就被关闭，连接名额在响应关闭时释放
+    response.call_on_close(_release_stream_slot)
+    return response
+
 @notifications_bp.route('/notifications/<int:notification_id>/read', methods=['POST'])
 @jwt_required()
 def mark_notification_read(notification_id):
@@ -121,7 +303,14 @@ def mark_notification_read(notification_id):
         if not notification:
             return jsonify({'error': '通知不存在'}), 404
         
-        notification.is_read = True
+        if not notification.is_read:
+            # 条件更新：并发重复标记同一条通知时计数只减一次
+            updated = Notification.query.filter_by(
+                id=notification.id,
+                is_read=False
+            ).update({'is_read': True})
+            adjust_unread_counts({user_id_int: -updated})
+            queue_event(db.session, user_id_int, {'type': 'unread_changed'})
         db.session.commit()
         
         return jsonify({
@@ -148,12 +337,15 @@ def mark_all_notifications_read():
         else:
             user_id_int = user_id
 
-        # 批量更新所有未读通知
-        Notification.query.filter_by(
+        # 批量更新所有未读通知，计数按实际更新的行数扣减
+        updated = Notification.query.filter_by(
             user_id=user_id_int,
             is_read=False
         ).update({'is_read': True})
+        adjust_unread_counts({user_id_int: -updated})
         
+        # 批量更新不经过 flush，需要手动登记推送事件
+        queue_event(db.session, user_id_int, {'type': 'unread_changed'})
         db.session.commit()
         
         return jsonify({
@@ -167,88 +359,143 @@ def mark_all_notifications_read():
 @jwt_required()
 @require_admin
 def get_admin_submission_notifications():
-    """获取管理员的任务提交通知"""
+    """
+    获取当前管理员未读的任务提交通知（游标分页，只读）
+    缺失的通知由 maintenance.py reconcile-notifications 补齐，不在这里写入
+    """
     try:
-        # 获取所有管理员用户
-        admin_users = User.query.filter_by(role='admin').all()
-        
-        if not admin_users:
-            return jsonify({'notifications': []}), 200
-        
-        # 获取所有待审核的提交
-        pending_submissions = TaskSubmission.query.filter_by(
-            review_status='pending'
-        ).order_by(TaskSubmission.submitted_at.desc()).all()
-        
-        notifications = []
-        for submission in pending_submissions:
-            for admin_user in admin_users:
-                # 检查是否已存在通知
-                existing_notification = Notification.query.filter_by(
-                    user_id=admin_user.id,
-                    related_submission_id=submission.id,
-                    type='submission_pending'
-                ).first()
-                
-                if not existing_notification:
-                    # 创建新通知
-                    notification = Notification(
-                        user_id=admin_user.id,
-                        title='新的任务提交',
-                        message=f'用户 {submission.user.username} 提交了任务 "{submission.task.title}"，等待审核。',
-                        type='submission_pending',
-                        related_task_id=submission.task_id,
-                        related_submission_id=submission.id
-                    )
-                    db.session.add(notification)
-                    notifications.append(notification)
+        user_id = get_jwt_identity()
         
-        db.session.commit()
+        # 确保用户ID是整数类型用于数据库查询
+        if isinstance(user_id, str):
+            try:
+                user_id_int = int(user_id)
+            except ValueError:
+                return jsonify({'error': '无效的用户ID格式'}), 400
+        else:
+            user_id_int = user_id
         
-        # 返回所有管理员的通知
-        all_notifications = []
-        for admin_user in admin_users:
-            user_notifications = Notification.query.filter_by(
-                user_id=admin_user.id,
-                is_read=False
-            ).order_by(Notification.created_at.desc()).all()
-            all_notifications.extend([n.to_dict() for n in user_notifications])
+        limit = parse_limit(request.args.get('limit'))
+        cursor = request.args.get('cursor')
+        
+        query = Notification.query.filter_by(
+            user_id=user_id_int,
+            type='submission_pending',
+            is_read=False
+        )
+        
+        try:
+            notifications, next_cursor = keyset_page(query, Notification.created_at, Notification.id, cursor, limit)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
         return jsonify({
-            'notifications': all_notifications
+            'notifications': serialize_notifications(notifications),
+            'next_cursor': next_cursor
         }), 200
         
     except Exception as e:
         return jsonify({'error': f'获取管理员通知失败: {str(e)}'}), 500
 
-def create_submission_notification(submission):
-    """创建任务提交通知（供其他模块调用）"""
-    try:
-        # 获取所有管理员用户
-        admin_users = User.query.filter_by(role='admin').all()
-        
-        for admin_user in admin_users:
-            # 检查是否已存在通知
-            existing_notification = Notification.query.filter_by(
-                user_id=admin_user.id,
-                related_submission_id=submission.id,
-                type='submission_pending'
-            ).first()
-            
-            if not existing_notification:
-                # 创建新通知
-                notification = Notification(
-                    user_id=admin_user.id,
-                    title='新的任务提交',
-                    message=f'用户 {submission.user.username} 提交了任务 "{submission.task.title}"，等待审核。',
-                    type='submission_pending',
-                    related_task_id=submission.task_id,
-                    related_submission_id=submission.id
-                )
-                db.session.add(notification)
-        
-        db.session.commit()
-        
-    except Exception as e:
-        print(f"创建通知失败: {e}")
-        db.session.rollback()
+def submission_notification_rows(submissions, admin_ids):
+    """
+    生成提交通知的待插入行，每个提交的消息文本只渲染一次
+    用户名和任务标题一次批量查询
+    """
+    user_names = load_user_names(submission.user_id for submission in submissions)
+    task_info = load_task_info(submission.task_id for submission in submissions)
+    now = datetime.utcnow()
+    
+    rows = []
+    for submission in submissions:
+        task_title = task_info.get(submission.task_id, (None, 0))[0]
+        message = f'用户 {user_names.get(submission.user_id)} 提交了任务 "{task_title}"，等待审核。'
+        for admin_id in admin_ids:
+            rows.append({
+                'user_id': admin_id,
+                'title': '新的任务提交',
+                'message': message,
+                'type': 'submission_pending',
+                'is_read': False,
+                'created_at': now,
+                'updated_at': now,
+                'related_task_id': submission.task_id,
+                'related_submission_id': submission.id
+            })
+    return rows
+
+def insert_notifications(rows):
+    """
+    单条多行 INSERT ... ON CONFLICT DO NOTHING 写入通知，已存在的自动跳过
+    返回实际插入的 [(通知ID, 用户ID)]，不提交事务
+    """
+    if not rows:
+        return []
+    
+    stmt = dialect_insert(Notification).values(rows).on_conflict_do_nothing(
+        index_elements=['user_id', 'related_submission_id', 'type']
+    ).returning(Notification.id, Notification.user_id)
+    inserted = db.session.execute(stmt).all()
+    
+    # 批量插入不经过 flush，手动登记推送事件
+    for notification_id, user_id in inserted:
+        queue_event(db.session, user_id, {'type': 'notification', 'id': notification_id})
+    adjust_unread_counts(Counter(user_id for _, user_id in inserted))
+    return inserted
+
+def replace_submission_notifications(submission_id, notification_type, rows):
+    """
+    被驳回后重新提交会复用同一个提交记录，唯一索引会让新通知被跳过：
+    先删除该提交之前的同类通知（扣减未读数），再写入新通知，不提交事务
+    """
+    previous = (
+        Notification.related_submission_id == submission_id,
+        Notification.type == notification_type
+    )
+    adjust_unread_counts(unread_deltas(*previous))
+    Notification.query.filter(*previous).delete(synchronize_session=False)
+    return insert_notifications(rows)
+
+@outbox_handler('submission_submitted')
+def notify_submission_submitted(payload):
+    """任务提交后通知所有管理员（由 outbox worker 执行）"""
+    submission = TaskSubmission.query.get(payload['submission_id'])
+    if not submission or submission.review_status != 'pending':
+        # 提交已被删除或已审核，通知已无意义
+        return
+    
+    # 获取所有管理员用户
+    admin_ids = [row.id for row in db.session.query(User.id).filter_by(role='admin').all()]
+    replace_submission_notifications(
+        submission.id, 'submission_pending', submission_notification_rows([submission], admin_ids)
+    )
+
+@outbox_handler('submission_reviewed')
+def notify_submission_reviewed(payload):
+    """审核完成后通知提交者（由 outbox worker 执行），重新提交后再次审核时替换上一次的结果通知"""
+    submission = TaskSubmission.query.get(payload['submission_id'])
+    if not submission or submission.review_status not in ('approved', 'rejected'):
+        return
+    
+    task_title = load_task_info([submission.task_id]).get(submission.task_id, (None, 0))[0]
+    if submission.review_status == 'approved':
+        title = '任务审核通过'
+        message = f'您提交的任务 "{task_title}" 已通过审核，获得 {submission.awarded_points} 积分。'
+    else:
+        title = '任务审核未通过'
+        message = f'您提交的任务 "{task_title}" 未通过审核。'
+    if submission.review_comments:
+        message += f' 审核意见：{submission.review_comments}'
+    
+    now = datetime.utcnow()
+    replace_submission_notifications(submission.id, 'submission_reviewed', [{
+        'user_id': submission.user_id,
+        'title': title,
+        'message': message,
+        'type': 'submission_reviewed',
+        'is_read': False,
+        'created_at': now,
+        'updated_at': now,
+        'related_task_id': submission.task_id,
+        'related_submission_id': submission.id
+    }])
@@ -1,12 +1,54 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from datetime import datetime, date
-from sqlalchemy import func, extract
-from src.models.user import db, User, PointRecord, MonthlySetting
+from datetime import datetime, date, timedelta
+from sqlalchemy import func, extract, insert, tuple_
+from src.models.user import db, User, PointRecord, MonthlySetting, MonthlyPointTotal, SalarySnapshot
+from src.utils.pagination import parse_limit, keyset_page
+from src.utils.monthly_points import POINT_COLUMNS
+from src.utils.cache import TTLCache, invalidate_on_write
+from src.utils.export import export_response, EXPORT_FORMATS
 from functools import wraps
 
 points_bp = Blueprint('points', __name__)
 
+# 积分趋势缓存：按查询范围缓存，积分写入时清空
+timeseries_cache = TTLCache(ttl=300)
+# 只随积分写入失效；新用户、改名等在 TTL 到期后体现
+invalidate_on_write(db.session, timeseries_cache, (PointRecord, MonthlyPointTotal))
+
+def monthly_points_query(year, month):
+    """所有用户当月获得的积分：每个用户按主键读取一行月度汇总，不扫描积分流水"""
+    return db.session.query(
+        User.id,
+        User.username,
+        User.email,
+        func.coalesce(MonthlyPointTotal.earned, 0).label('monthly_points')
+    ).outerjoin(
+        MonthlyPointTotal,
+        (MonthlyPointTotal.user_id == User.id) &
+        (MonthlyPointTotal.year == year) &
+        (MonthlyPointTotal.month == month)
+    ).order_by(User.id)
+
+def monthly_points_by_user(year, month):
+    return monthly_points_query(year, month).all()
+
+def snapshot_points_query(year, month):
+    """已确认月份冻结的每用户积分，列名与 monthly_points_query 一致"""
+    return db.session.query(
+        SalarySnapshot.user_id.label('id'),
+        SalarySnapshot.username,
+        SalarySnapshot.email,
+        SalarySnapshot.monthly_points
+    ).filter_by(year=year, month=month).order_by(SalarySnapshot.user_id)
+
+def parse_export_format():
+    fmt = request.args.get('format', 'csv').lower()
+    return fmt if fmt in EXPORT_FORMATS else None
+
+# 导出时每批从数据库读取的行数（PostgreSQL 上使用服务端游标）
+EXPORT_BATCH_SIZE = 1000
+
 @points_bp.route('/points/my', methods=['GET'])
 @jwt_required()
 def get_my_points():
@@ -32,22 +74,126 @@ def get_my_points():
         if not user:
             return jsonify({'error': '用户不存在'}), 404
         
-        # 获取用户的积分记录
-        point_records = PointRecord.query.filter_by(user_id=user_id_int).order_by(PointRecord.created_at.desc()).all()
-        
-        # 计算总积分
-        total_points = sum(record.points for record in point_records if record.type == 'earned')
+        # 总积分由月度汇总相加（每个月一行），与积分流水的长度无关
+        # 积分流水通过 /points/my/ledger 分页获取
+        total_points = db.session.query(
+            func.coalesce(func.sum(MonthlyPointTotal.earned), 0)
+        ).filter(MonthlyPointTotal.user_id == user_id_int).scalar()
         
         return jsonify({
             'user': user.to_dict(),
-            'total_points': total_points,
-            'point_records': [record.to_dict() for record in point_records]
+            'total_points': int(total_points)
         }), 200
         
     except Exception as e:
         print(f"❌ 调试: 获取积分失败: {e}")
         return jsonify({'error': f'获取积分失败: {str(e)}'}), 500
 
+def ledger_query(user_id):
+    """按请求参数 from / to（YYYY-MM-DD）/ type 筛选用户的积分流水；日期格式错误时抛出 ValueError"""
+    date_from = request.args.get('from')
+    date_to = request.args.get('to')
+    record_type = request.args.get('type')
+    
+    query = PointRecord.query.filter_by(user_id=user_id)
+    
+    if record_type:
+        query = query.filter_by(type=record_type)
+    if date_from:
+        query = query.filter(PointRecord.created_at >= datetime.strptime(date_from, '%Y-%m-%d'))
+    if date_to:
+        # 结束日期包含当天
+        query = query.filter(PointRecord.created_at < datetime.strptime(date_to, '%Y-%m-%d') + timedelta(days=1))
+    return query
+
+@points_bp.route('/points/my/ledger', methods=['GET'])
+@jwt_required()
+def get_my_point_ledger():
+    """当前用户的积分流水（游标分页，可按日期范围和类型筛选）"""
+    try:
+        user_id = get_jwt_identity()
+        
+        # 确保用户ID是整数类型用于数据库查询
+        if isinstance(user_id, str):
+            try:
+                user_id_int = int(user_id)
+            except ValueError:
+                return jsonify({'error': '无效的用户ID格式'}), 400
+        else:
+            user_id_int = user_id
+        
+        cursor = request.args.get('cursor')
+        limit = parse_limit(request.args.get('limit'))
+        
+        try:
+            query = ledger_query(user_id_int)
+        except ValueError:
+            return jsonify({'error': '日期格式错误，请使用 YYYY-MM-DD 格式'}), 400
+        
+        try:
+            point_records, next_cursor = keyset_page(query, PointRecord.created_at, PointRecord.id, cursor, limit)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        return jsonify({
+            'point_records': [record.to_dict() for record in point_records],
+            'next_cursor': next_cursor
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': f'获取积分流水失败: {str(e)}'}), 500
+
+@points_bp.route('/points/my/ledger/export', methods=['GET'])
+@jwt_required()
+def export_point_ledger():
+    """导出积分流水（format=csv|xlsx）；管理员可以通过 user_id 导出其他用户的流水"""
+    try:
+        user_id = get_jwt_identity()
+        
+        # 确保用户ID是整数类型用于数据库查询
+        if isinstance(user_id, str):
+            try:
+                user_id_int = int(user_id)
+            except ValueError:
+                return jsonify({'error': '无效的用户ID格式'}), 400
+        else:
+            user_id_int = user_id
+        
+        fmt = parse_export_format()
+        if not fmt:
+            return jsonify({'error': '导出格式必须是 csv 或 xlsx'}), 400
+        
+        target_id = request.args.get('user_id', user_id_int, type=int)
+        if target_id != user_id_int:
+            current_user = User.query.get(user_id_int)
+            if not current_user or current_user.role != 'admin':
+                return jsonify({'error': '没有权限查看此用户积分'}), 403
+        
+        user = User.query.get(target_id)
+        if not user:
+            return jsonify({'error': '用户不存在'}), 404
+        
+        try:
+            query = ledger_query(target_id)
+        except ValueError:
+            return jsonify({'error': '日期格式错误，请使用 YYYY-MM-DD 格式'}), 400
+        
+        records = query.order_by(PointRecord.created_at.desc(), PointRecord.id.desc()).yield_per(EXPORT_BATCH_SIZE)
+        columns = [
+            ('created_at', '时间'), ('type', '类型'), ('points', '积分'),
+            ('task_id', '任务ID'), ('description', '说明')
+        ]
+        summary = [
+            ('用户', user.username),
+            ('开始日期', request.args.get('from') or ''),
+            ('结束日期', request.args.get('to') or '')
+        ]
+        rows = (record.to_dict() for record in records)
+        return export_response(f'积分流水_{user.username}', fmt, columns, rows, summary)
+        
+    except Exception as e:
+        return jsonify({'error': f'导出积分流水失败: {str(e)}'}), 500
+
 def require_admin(f):
     """装饰器：要求管理员权限"""
     @wraps(f)
@@ -128,26 +274,18 @@ def get_monthly_points():
         year = request.args.get('year', datetime.now().year, type=int)
         month = request.args.get('month', datetime.now().month, type=int)
         
-        # 获取所有用户的月度积分统计
-        users_points = db.session.query(
-            User.id,
-            User.username,
-            User.email,
-            func.coalesce(func.sum(PointRecord.points), 0).label('monthly_points')
-        ).outerjoin(
-            PointRecord,
-            (PointRecord.user_id == User.id) &
-            (extract('year', PointRecord.created_at) == year) &
-            (extract('month', PointRecord.created_at) == month) &
-            (PointRecord.type == 'earned')
-        ).group_by(User.id, User.username, User.email).all()
+        # 获取月度设置
+        monthly_setting = MonthlySetting.query.filter_by(year=year, month=month).first()
+        
+        # 获取所有用户的月度积分统计：已确认月份读取冻结的快照，否则读取月度汇总表
+        if monthly_setting and monthly_setting.is_finalized:
+            users_points = snapshot_points_query(year, month).all()
+        else:
+            users_points = monthly_points_by_user(year, month)
         
         # 计算总积分
         total_points = sum(user.monthly_points for user in users_points)
         
-        # 获取月度设置
-        monthly_setting = MonthlySetting.query.filter_by(year=year, month=month).first()
-        
         result = {
             'year': year,
             'month': month,
@@ -169,6 +307,143 @@ def get_monthly_points():
     except Exception as e:
         return jsonify({'error': f'获取月度积分统计失败: {str(e)}'}), 500
 
+# 积分趋势最多覆盖的月数
+TIMESERIES_MAX_MONTHS = 36
+
+def _parse_month(value):
+    """解析 YYYY-MM，返回 (年, 月)"""
+    parsed = datetime.strptime(value, '%Y-%m')
+    return parsed.year, parsed.month
+
+def _month_range(start, end):
+    """[(年, 月), ...]，包含首尾"""
+    months = []
+    year, month = start
+    while (year, month) <= end:
+        months.append((year, month))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+def points_matrix(users, totals, months, window):
+    """
+    把 {(用户ID, 年, 月): 积分} 整理成 用户 × 月份 的稠密矩阵，一次遍历同时算出
+    每个用户的总积分、滑动平均（窗口不足时为 None）和每月合计，最后按总积分排名（并列同名次）
+    """
+    month_totals = [0] * len(months)
+    result = []
+    for user_id, username in users:
+        points = [totals.get((user_id, year, month), 0) for year, month in months]
+        moving_average = []
+        running = 0
+        for i, value in enumerate(points):
+            month_totals[i] += value
+            running += value
+            if i >= window:
+                running -= points[i - window]
+            moving_average.append(round(running / window, 2) if i >= window - 1 else None)
+        result.append({
+            'user_id': user_id,
+            'username': username,
+            'points': points,
+            'moving_average': moving_average,
+            'total': sum(points)
+        })
+    
+    ordered = sorted(result, key=lambda row: row['total'], reverse=True)
+    for i, row in enumerate(ordered):
+        row['rank'] = ordered[i - 1]['rank'] if i and row['total'] == ordered[i - 1]['total'] else i + 1
+    return result, month_totals
+
+@points_bp.route('/points/timeseries', methods=['GET'])
+@jwt_required()
+@require_admin
+def get_points_timeseries():
+    """多月积分趋势：from/to 为 YYYY-MM（默认最近 12 个月），window 为滑动平均的月数"""
+    try:
+        now = datetime.utcnow()
+        try:
+            end = _parse_month(request.args['to']) if request.args.get('to') else (now.year, now.month)
+            if request.args.get('from'):
+                start = _parse_month(request.args['from'])
+            else:
+                start = _month_range((end[0] - 1, end[1]), end)[1]
+        except ValueError:
+            return jsonify({'error': '月份格式错误，请使用 YYYY-MM 格式'}), 400
+        
+        months = _month_range(start, end)
+        if not months:
+            return jsonify({'error': '开始月份不能晚于结束月份'}), 400
+        if len(months) > TIMESERIES_MAX_MONTHS:
+            return jsonify({'error': f'最多查询 {TIMESERIES_MAX_MONTHS} 个月'}), 400
+        
+        point_type = request.args.get('type', 'earned')
+        if point_type not in POINT_COLUMNS:
+            return jsonify({'error': '积分类型必须是 earned、bonus 或 deduction'}), 400
+        window = max(1, min(request.args.get('window', 3, type=int), len(months)))
+        
+        def compute():
+            column = getattr(MonthlyPointTotal, POINT_COLUMNS[point_type])
+            # 月度汇总表已按 (年, 月, 用户) 分组；年份范围走主键前缀，首尾月份再精确过滤
+            rows = db.session.query(
+                MonthlyPointTotal.user_id, MonthlyPointTotal.year, MonthlyPointTotal.month, column
+            ).filter(
+                MonthlyPointTotal.year.between(start[0], end[0]),
+                tuple_(MonthlyPointTotal.year, MonthlyPointTotal.month) >= start,
+                tuple_(MonthlyPointTotal.year, MonthlyPointTotal.month) <= end
+            ).all()
+            totals = {(user_id, year, month): value for user_id, year, month, value in rows}
+            users = db.session.query(User.id, User.username).order_by(User.id).all()
+            
+            matrix, month_totals = points_matrix(users, totals, months, window)
+            return {
+                'from': '%04d-%02d' % start,
+                'to': '%04d-%02d' % end,
+                'type': point_type,
+                'window': window,
+                'months': ['%04d-%02d' % month for month in months],
+                'month_totals': month_totals,
+                'total_points': sum(month_totals),
+                'users': matrix
+            }
+        
+        ttl = current_app.config.get('POINTS_TIMESERIES_CACHE_TTL', timeseries_cache.ttl)
+        result = timeseries_cache.get_or_compute((start, end, point_type, window), compute, ttl)
+        return jsonify(result), 200
+        
+    except Exception as e:
+        return jsonify({'error': f'获取积分趋势失败: {str(e)}'}), 500
+
+@points_bp.route('/points/monthly/export', methods=['GET'])
+@jwt_required()
+@require_admin
+def export_monthly_points():
+    """导出月度积分统计（format=csv|xlsx）"""
+    try:
+        year = request.args.get('year', datetime.now().year, type=int)
+        month = request.args.get('month', datetime.now().month, type=int)
+        fmt = parse_export_format()
+        if not fmt:
+            return jsonify({'error': '导出格式必须是 csv 或 xlsx'}), 400
+        
+        monthly_setting = MonthlySetting.query.filter_by(year=year, month=month).first()
+        if monthly_setting and monthly_setting.is_finalized:
+            query = snapshot_points_query(year, month)
+        else:
+            query = monthly_points_query(year, month)
+        
+        # 总积分单独聚合，数据行逐批读取
+        total_points = db.session.query(
+            func.coalesce(func.sum(query.subquery().c.monthly_points), 0)
+        ).scalar()
+        
+        columns = [('user_id', '用户ID'), ('username', '用户名'), ('email', '邮箱'), ('monthly_points', '月度积分')]
+        summary = [('年份', year), ('月份', month), ('总积分', int(total_points))]
+        rows = (row._asdict() | {'user_id': row.id} for row in query.yield_per(EXPORT_BATCH_SIZE))
+        return export_response(f'月度积分_{year}-{month:02d}', fmt, columns, rows, summary)
+        
+    except Exception as e:
+        return jsonify({'error': f'导出月度积分统计失败: {str(e)}'}), 500
+
 @points_bp.route('/monthly/settings', methods=['GET'])
 @jwt_required()
 @require_admin
@@ -244,6 +519,28 @@ def set_monthly_settings():
         db.session.rollback()
         return jsonify({'error': f'保存月度设置失败: {str(e)}'}), 500
 
+def salary_rows(monthly_setting, users_points):
+    """
+    按月度设置分配利润池
+    返回 (利润池, 总积分, 每积分价值, [(用户行, 占比, 工资)])，总积分为 0 时每积分价值为 0
+    """
+    total_points = sum(user.monthly_points for user in users_points)
+    profit_pool, point_value = salary_pool(monthly_setting, total_points)
+    
+    rows = []
+    for user in users_points:
+        rows.append((user, *user_salary(user.monthly_points, total_points, point_value)))
+    return profit_pool, total_points, point_value, rows
+
+def salary_pool(monthly_setting, total_points):
+    """返回 (利润池, 每积分价值)"""
+    profit_pool = float(monthly_setting.total_profit) * float(monthly_setting.profit_percentage) / 100
+    return profit_pool, (profit_pool / total_points if total_points else 0)
+
+def user_salary(points, total_points, point_value):
+    """返回 (占比, 工资)"""
+    return (points / total_points if total_points else 0), round(points * point_value, 2)
+
 @points_bp.route('/monthly/salary', methods=['GET'])
 @jwt_required()
 @require_admin
@@ -260,22 +557,38 @@ def calculate_monthly_salary():
         if not monthly_setting.total_profit or not monthly_setting.profit_percentage:
             return jsonify({'error': '月度设置不完整'}), 400
         
-        # 获取所有用户的月度积分
-        users_points = db.session.query(
-            User.id,
-            User.username,
-            User.email,
-            func.coalesce(func.sum(PointRecord.points), 0).label('monthly_points')
-        ).outerjoin(
-            PointRecord,
-            (PointRecord.user_id == User.id) &
-            (extract('year', PointRecord.created_at) == year) &
-            (extract('month', PointRecord.created_at) == month) &
-            (PointRecord.type == 'earned')
-        ).group_by(User.id, User.username, User.email).all()
-        
-        # 计算总积分
-        total_points = sum(user.monthly_points for user in users_points)
+        if monthly_setting.is_finalized:
+            # 已确认月份：直接读取确认时冻结的快照，不再计算，也不写入
+            snapshots = SalarySnapshot.query.filter_by(year=year, month=month).order_by(SalarySnapshot.user_id).all()
+            profit_pool, _ = salary_pool(monthly_setting, 0)
+            total_points = sum(snapshot.monthly_points for snapshot in snapshots)
+            point_value = float(monthly_setting.points_value or 0)
+            users_salary = [
+                {
+                    'user_id': snapshot.user_id,
+                    'username': snapshot.username,
+                    'email': snapshot.email,
+                    'monthly_points': snapshot.monthly_points,
+                    'share': float(snapshot.share),
+                    'salary': float(snapshot.salary)
+                }
+                for snapshot in snapshots
+            ]
+        else:
+            # 获取所有用户的月度积分
+            users_points = monthly_points_by_user(year, month)
+            profit_pool, total_points, point_value, rows = salary_rows(monthly_setting, users_points)
+            users_salary = [
+                {
+                    'user_id': user.id,
+                    'username': user.username,
+                    'email': user.email,
+                    'monthly_points': user.monthly_points,
+                    'share': round(share, 8),
+                    'salary': salary
+                }
+                for user, share, salary in rows
+            ]
         
         if total_points == 0:
             return jsonify({
@@ -284,29 +597,10 @@ def calculate_monthly_salary():
                 'month': month,
                 'total_points': 0,
                 'point_value': 0,
+                'is_finalized': bool(monthly_setting.is_finalized),
                 'users': []
             }), 200
         
-        # 计算积分价值
-        profit_pool = float(monthly_setting.total_profit) * float(monthly_setting.profit_percentage) / 100
-        point_value = profit_pool / total_points
-        
-        # 更新月度设置中的积分价值
-        monthly_setting.points_value = point_value
-        db.session.commit()
-        
-        # 计算每个用户的工资
-        users_salary = []
-        for user in users_points:
-            salary = user.monthly_points * point_value
-            users_salary.append({
-                'user_id': user.id,
-                'username': user.username,
-                'email': user.email,
-                'monthly_points': user.monthly_points,
-                'salary': round(salary, 2)
-            })
-        
         return jsonify({
             'year': year,
             'month': month,
@@ -315,12 +609,90 @@ def calculate_monthly_salary():
             'profit_pool': round(profit_pool, 2),
             'total_points': total_points,
             'point_value': round(point_value, 4),
+            'is_finalized': bool(monthly_setting.is_finalized),
             'users': users_salary
         }), 200
         
     except Exception as e:
         return jsonify({'error': f'计算工资失败: {str(e)}'}), 500
 
+@points_bp.route('/monthly/salary/export', methods=['GET'])
+@jwt_required()
+@require_admin
+def export_monthly_salary():
+    """导出月度工资表（format=csv|xlsx），表头前附利润池和积分价值"""
+    try:
+        year = request.args.get('year', datetime.now().year, type=int)
+        month = request.args.get('month', datetime.now().month, type=int)
+        fmt = parse_export_format()
+        if not fmt:
+            return jsonify({'error': '导出格式必须是 csv 或 xlsx'}), 400
+        
+        monthly_setting = MonthlySetting.query.filter_by(year=year, month=month).first()
+        if not monthly_setting:
+            return jsonify({'error': '请先设置该月份的利润和百分比'}), 400
+        
+        if not monthly_setting.total_profit or not monthly_setting.profit_percentage:
+            return jsonify({'error': '月度设置不完整'}), 400
+        
+        columns = [
+            ('user_id', '用户ID'), ('username', '用户名'), ('email', '邮箱'),
+            ('monthly_points', '月度积分'), ('share', '占比'), ('salary', '工资')
+        ]
+        
+        if monthly_setting.is_finalized:
+            # 已确认月份：逐批读取冻结的快照
+            total_points = db.session.query(
+                func.coalesce(func.sum(SalarySnapshot.monthly_points), 0)
+            ).filter_by(year=year, month=month).scalar()
+            profit_pool, _ = salary_pool(monthly_setting, 0)
+            point_value = float(monthly_setting.points_value or 0)
+            snapshots = db.session.query(
+                SalarySnapshot.user_id, SalarySnapshot.username, SalarySnapshot.email,
+                SalarySnapshot.monthly_points, SalarySnapshot.share, SalarySnapshot.salary
+            ).filter_by(year=year, month=month).order_by(SalarySnapshot.user_id).yield_per(EXPORT_BATCH_SIZE)
+            rows = ({
+                'user_id': snapshot.user_id,
+                'username': snapshot.username,
+                'email': snapshot.email,
+                'monthly_points': snapshot.monthly_points,
+                'share': float(snapshot.share),
+                'salary': float(snapshot.salary)
+            } for snapshot in snapshots)
+        else:
+            # 先聚合总积分得到积分价值，再逐批读取每个用户计算工资
+            total_points = db.session.query(
+                func.coalesce(func.sum(MonthlyPointTotal.earned), 0)
+            ).filter_by(year=year, month=month).scalar()
+            profit_pool, point_value = salary_pool(monthly_setting, total_points)
+            
+            def salary_row(user):
+                share, salary = user_salary(user.monthly_points, total_points, point_value)
+                return {
+                    'user_id': user.id,
+                    'username': user.username,
+                    'email': user.email,
+                    'monthly_points': user.monthly_points,
+                    'share': round(share, 8),
+                    'salary': salary
+                }
+            rows = (salary_row(user) for user in monthly_points_query(year, month).yield_per(EXPORT_BATCH_SIZE))
+        
+        summary = [
+            ('年份', year),
+            ('月份', month),
+            ('总利润', float(monthly_setting.total_profit)),
+            ('利润百分比', float(monthly_setting.profit_percentage)),
+            ('利润池', round(profit_pool, 2)),
+            ('总积分', int(total_points)),
+            ('积分价值', round(point_value, 4)),
+            ('已确认', '是' if monthly_setting.is_finalized else '否')
+        ]
+        return export_response(f'工资表_{year}-{month:02d}', fmt, columns, rows, summary)
+        
+    except Exception as e:
+        return jsonify({'error': f'导出工资表失败: {str(e)}'}), 500
+
 @points_bp.route('/monthly/finalize', methods=['POST'])
 @jwt_required()
 @require_admin
@@ -334,8 +706,37 @@ def finalize_monthly_settings():
         if not monthly_setting:
             return jsonify({'error': '月度设置不存在'}), 404
         
-        monthly_setting.is_finalized = True
-        db.session.commit()
+        if not monthly_setting.is_finalized:
+            if not monthly_setting.total_profit or not monthly_setting.profit_percentage:
+                return jsonify({'error': '月度设置不完整'}), 400
+            
+            profit_pool, total_points, point_value, rows = salary_rows(
+                monthly_setting, monthly_points_by_user(year, month)
+            )
+            
+            # 条件更新：并发确认时只有一个请求写入快照
+            finalized = MonthlySetting.query.filter_by(
+                id=monthly_setting.id,
+                is_finalized=False
+            ).update({'is_finalized': True, 'points_value': point_value})
+            
+            if finalized and total_points:
+                now = datetime.utcnow()
+                db.session.execute(insert(SalarySnapshot), [
+                    {
+                        'year': year,
+                        'month': month,
+                        'user_id': user.id,
+                        'username': user.username,
+                        'email': user.email,
+                        'monthly_points': user.monthly_points,
+                        'share': share,
+                        'salary': salary,
+                        'created_at': now
+                    }
+                    for user, share, salary in rows
+                ])
+            db.session.commit()
         
         return jsonify({
             'message': '月度设置已确认',
@@ -345,4 +746,3 @@ def finalize_monthly_settings():
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': f'确认月度设置失败: {str(e)}'}), 500
-
@@ -0,0 +1,83 @@
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy import or_
+from src.models.user import db, User, Task, TaskSubmission
+from src.database.fulltext import match_subquery
+from src.utils.pagination import parse_limit
+from src.utils.serializers import serialize_tasks, serialize_submissions
+
+search_bp = Blueprint('search', __name__)
+
+SEARCH_TYPES = ('all', 'tasks', 'submissions')
+
+def _ranked_page(model, table, q, page, limit, permission_filter=None):
+    """全文检索一页结果，按相关度排序，返回 (记录列表, 是否还有下一页)"""
+    matches = match_subquery(db.session, table, q)
+    if matches is None:
+        return [], False
+
+    query = db.session.query(model).join(matches, matches.c.id == model.id)
+    if permission_filter is not None:
+        query = query.filter(permission_filter)
+
+    rows = query.order_by(matches.c.rank, model.id.desc()) \
+        .offset((page - 1) * limit).limit(limit + 1).all()
+    return rows[:limit], len(rows) > limit
+
+@search_bp.route('/search', methods=['GET'])
+@jwt_required()
+def search():
+    """全文搜索任务和提交（标题、描述、发布人、提交说明）"""
+    try:
+        user_id = get_jwt_identity()
+
+        # 确保用户ID是整数类型用于数据库查询
+        if isinstance(user_id, str):
+            try:
+                user_id_int = int(user_id)
+            except ValueError:
+                return jsonify({'error': '无效的用户ID格式'}), 400
+        else:
+            user_id_int = user_id
+
+        user = User.query.get(user_id_int)
+        if not user:
+            return jsonify({'error': '用户不存在'}), 404
+
+        q = (request.args.get('q') or '').strip()
+        if not q:
+            return jsonify({'error': '搜索关键词不能为空'}), 400
+
+        search_type = request.args.get('type', 'all')
+        if search_type not in SEARCH_TYPES:
+            return jsonify({'error': 'type 必须是 all、tasks 或 submissions'}), 400
+
+        page = max(request.args.get('page', 1, type=int) or 1, 1)
+        limit = parse_limit(request.args.get('limit'), default=20)
+
+        # 普通用户只能搜到可接受的任务和自己的任务/提交
+        if user.role == 'admin':
+            task_filter = None
+            submission_filter = None
+        else:
+            task_filter = or_(Task.status == 'open', Task.assigned_to == user_id_int)
+            submission_filter = TaskSubmission.user_id == user_id_int
+
+        result = {'query': q, 'page': page, 'limit': limit}
+
+        if search_type in ('all', 'tasks'):
+            tasks, has_more = _ranked_page(Task, 'task', q, page, limit, task_filter)
+            result['tasks'] = serialize_tasks(tasks)
+            result['tasks_has_more'] = has_more
+
+        if search_type in ('all', 'submissions'):
+            submissions, has_more = _ranked_page(
+                TaskSubmission, 'task_submission', q, page, limit, submission_filter
+            )
+            result['submissions'] = serialize_submissions(submissions)
+            result['submissions_has_more'] = has_more
+
+        return jsonify(result), 200
+
+    except Exception as e:
+        return jsonify({'error': f'搜索失败: {str(e)}'}), 500
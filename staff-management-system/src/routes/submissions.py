@@ -1,8 +1,16 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from datetime import datetime
+from datetime import datetime, timedelta
+from collections import defaultdict
+from sqlalchemy import insert
+from sqlalchemy.orm import defer
 from src.models.user import db, User, Task, TaskSubmission, PointRecord
-from src.routes.notifications import create_submission_notification
+from src.utils.outbox import enqueue, enqueue_many
+from src.utils.monthly_points import record_points, add_monthly_points, add_total_points
+from src.utils.review_lease import lease_submissions, leased_by_other, release_lease
+from src.utils.pagination import keyset_query, split_page, parse_limit, parse_bool
+from src.utils.serializers import serialize_submissions, load_task_info, load_user_names, load_submission_files
+from src.utils.conditional import query_fingerprint, request_etag, is_not_modified, not_modified_response, conditional_json
 from functools import wraps
 
 submissions_bp = Blueprint('submissions', __name__)
@@ -28,24 +36,83 @@ def require_admin(f):
         return f(*args, **kwargs)
     return wrapper
 
+def filter_submissions(query, args):
+    """按查询参数筛选提交：status（逗号分隔）、task_id、user_id、submitted_from / submitted_to（YYYY-MM-DD）"""
+    status = args.get('status')
+    task_id = args.get('task_id', type=int)
+    user_id = args.get('user_id', type=int)
+    submitted_from = args.get('submitted_from')
+    submitted_to = args.get('submitted_to')
+    
+    if status:
+        statuses = [s for s in status.split(',') if s]
+        query = query.filter(TaskSubmission.review_status.in_(statuses))
+    if task_id:
+        query = query.filter(TaskSubmission.task_id == task_id)
+    if user_id:
+        query = query.filter(TaskSubmission.user_id == user_id)
+    
+    try:
+        if submitted_from:
+            query = query.filter(TaskSubmission.submitted_at >= datetime.strptime(submitted_from, '%Y-%m-%d'))
+        if submitted_to:
+            # 结束日期包含当天
+            query = query.filter(TaskSubmission.submitted_at < datetime.strptime(submitted_to, '%Y-%m-%d') + timedelta(days=1))
+    except ValueError:
+        raise ValueError('日期格式错误，请使用 YYYY-MM-DD 格式')
+    return query
+
+def submission_list_response(query, viewer_id):
+    """
+    提交列表：按 (提交时间, ID) 倒序游标分页（limit、cursor），列表中不加载说明、文件和审核意见，详情见 /submissions/<id>
+    paginate=false 兼容旧客户端，返回包含全部字段的完整列表
+    """
+    paginate = parse_bool(request.args.get('paginate'), default=True)
+    cursor = request.args.get('cursor')
+    limit = parse_limit(request.args.get('limit'))
+    
+    try:
+        query = filter_submissions(query, request.args)
+        if paginate:
+            query = keyset_query(
+                query.options(*(defer(getattr(TaskSubmission, column)) for column in TaskSubmission.DETAIL_COLUMNS)),
+                TaskSubmission.submitted_at, TaskSubmission.id, cursor, limit
+            )
+        else:
+            query = query.order_by(TaskSubmission.submitted_at.desc(), TaskSubmission.id.desc())
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    # 条件 GET：数据没有变化时直接返回 304，不加载提交
+    # 响应中包含任务标题/最大积分和提交者用户名
+    count, last_modified, id_sum = query_fingerprint(
+        query, TaskSubmission.id, TaskSubmission.updated_at,
+        related=[(TaskSubmission.task_id, Task), (TaskSubmission.user_id, User)]
+    )
+    etag = request_etag(viewer_id, count, last_modified, id_sum)
+    if is_not_modified(etag):
+        return not_modified_response(etag, last_modified)
+    
+    if not paginate:
+        return conditional_json({
+            'submissions': serialize_submissions(query.all())
+        }, etag, last_modified)
+    
+    submissions, next_cursor = split_page(query.all(), TaskSubmission.submitted_at, TaskSubmission.id, limit)
+    
+    return conditional_json({
+        'submissions': serialize_submissions(submissions, detail=False),
+        'next_cursor': next_cursor,
+        'has_more': next_cursor is not None,
+        'limit': limit
+    }, etag, last_modified)
+
 @submissions_bp.route('/submissions', methods=['GET'])
 @jwt_required()
 @require_admin
 def get_submissions():
     try:
-        # 获取查询参数
-        status = request.args.get('status')
-        
-        query = TaskSubmission.query
-        
-        if status:
-            query = query.filter_by(review_status=status)
-        
-        submissions = query.order_by(TaskSubmission.submitted_at.desc()).all()
-        
-        return jsonify({
-            'submissions': [submission.to_dict() for submission in submissions]
-        }), 200
+        return submission_list_response(TaskSubmission.query, None)
         
     except Exception as e:
         return jsonify({'error': f'获取提交列表失败: {str(e)}'}), 500
@@ -82,35 +149,64 @@ def get_submission(submission_id):
     except Exception as e:
         return jsonify({'error': f'获取提交详情失败: {str(e)}'}), 500
 
+# 批量审核单次最多处理的提交数
+REVIEW_BATCH_MAX_ITEMS = 500
+
+def validate_review(data, max_points):
+    """校验审核参数，返回 (审核状态, 奖励积分, 错误信息)"""
+    if 'review_status' not in data or 'awarded_points' not in data:
+        return None, None, '审核状态和奖励积分都是必需的'
+    
+    review_status = data['review_status']
+    awarded_points = data['awarded_points']
+    
+    if review_status not in ['approved', 'rejected']:
+        return None, None, '审核状态必须是 approved 或 rejected'
+    
+    if not isinstance(awarded_points, int) or isinstance(awarded_points, bool) \
+            or awarded_points < 0 or awarded_points > max_points:
+        return None, None, f'奖励积分必须在 0 到 {max_points} 之间'
+    
+    return review_status, awarded_points, None
+
 @submissions_bp.route('/submissions/<int:submission_id>/review', methods=['POST'])
 @jwt_required()
 @require_admin
 def review_submission(submission_id):
     try:
-        submission = TaskSubmission.query.get(submission_id)
-        if not submission:
-            return jsonify({'error': '提交记录不存在'}), 404
+        user_id = get_jwt_identity()
         
-        data = request.get_json()
+        # 确保用户ID是整数类型用于数据库查询
+        if isinstance(user_id, str):
+            try:
+                user_id_int = int(user_id)
+            except ValueError:
+                return jsonify({'error': '无效的用户ID格式'}), 400
+        else:
+            user_id_int = user_id
         
-        # 验证必需字段
-        if 'review_status' not in data or 'awarded_points' not in data:
-            return jsonify({'error': '审核状态和奖励积分都是必需的'}), 400
+        # PostgreSQL 上加行锁：并发审核同一提交时，后到的请求等前一个提交后看到已审核状态
+        submission = TaskSubmission.query.filter_by(id=submission_id).with_for_update().first()
+        if not submission:
+            return jsonify({'error': '提交记录不存在'}), 404
         
-        review_status = data['review_status']
-        awarded_points = data['awarded_points']
+        if submission.review_status != 'pending':
+            return jsonify({'error': '该提交已审核'}), 409
+        if leased_by_other(submission, user_id_int):
+            return jsonify({'error': '该提交正在由其他管理员审核'}), 409
         
-        if review_status not in ['approved', 'rejected']:
-            return jsonify({'error': '审核状态必须是 approved 或 rejected'}), 400
+        data = request.get_json()
         
-        if awarded_points < 0 or awarded_points > submission.task.max_points:
-            return jsonify({'error': f'奖励积分必须在 0 到 {submission.task.max_points} 之间'}), 400
+        review_status, awarded_points, error = validate_review(data, submission.task.max_points)
+        if error:
+            return jsonify({'error': error}), 400
         
         # 更新提交记录
         submission.review_status = review_status
         submission.awarded_points = awarded_points
         submission.review_comments = data.get('review_comments', '')
         submission.reviewed_at = datetime.utcnow()
+        release_lease(submission)
         
         # 更新任务状态
         task = submission.task
@@ -122,20 +218,24 @@ def review_submission(submission_id):
                 user = submission.user
                 user.total_points += awarded_points
                 
-                # 创建积分记录
+                # 创建积分记录，并在同一事务中累加月度汇总
                 point_record = PointRecord(
                     user_id=user.id,
                     task_id=task.id,
                     points=awarded_points,
                     type='earned',
-                    description=f'完成任务: {task.title}'
+                    description=f'完成任务: {task.title}',
+                    created_at=datetime.utcnow()
                 )
                 db.session.add(point_record)
+                record_points(user.id, 'earned', awarded_points, point_record.created_at)
         else:
             # 拒绝的任务重新开放
             task.status = 'open'
             task.assigned_to = None
         
+        # 通知提交者审核结果：与审核写在同一事务中，由 outbox worker 在后台发送
+        enqueue(db.session, 'submission_reviewed', {'submission_id': submission.id})
         db.session.commit()
         
         return jsonify({
@@ -147,9 +247,14 @@ def review_submission(submission_id):
         db.session.rollback()
         return jsonify({'error': f'审核失败: {str(e)}'}), 500
 
-@submissions_bp.route('/submissions/my', methods=['GET'])
+@submissions_bp.route('/submissions/review/batch', methods=['POST'])
 @jwt_required()
-def get_my_submissions():
+@require_admin
+def review_submissions_batch():
+    """
+    批量审核：{"reviews": [{"id", "review_status", "awarded_points", "review_comments"}]}
+    每条单独校验，通过校验的在同一个事务中写入，返回逐条结果
+    """
     try:
         user_id = get_jwt_identity()
         
@@ -162,13 +267,204 @@ def get_my_submissions():
         else:
             user_id_int = user_id
         
-        submissions = TaskSubmission.query.filter_by(user_id=user_id_int)\
-            .order_by(TaskSubmission.submitted_at.desc()).all()
+        data = request.get_json(silent=True) or {}
+        reviews = data.get('reviews')
+        
+        if not isinstance(reviews, list) or not reviews:
+            return jsonify({'error': 'reviews 必须是非空数组'}), 400
+        if len(reviews) > REVIEW_BATCH_MAX_ITEMS:
+            return jsonify({'error': f'单次最多审核 {REVIEW_BATCH_MAX_ITEMS} 条提交'}), 400
+        
+        ids = [item.get('id') for item in reviews if isinstance(item, dict)]
+        ids = [sid for sid in ids if isinstance(sid, int) and not isinstance(sid, bool)]
+        
+        # 一次查询加载所有提交（PostgreSQL 上加行锁，防止并发审核重复加分），一次查询加载涉及的任务
+        submissions = {
+            submission.id: submission
+            for submission in TaskSubmission.query.filter(TaskSubmission.id.in_(ids)).with_for_update()
+        } if ids else {}
+        task_info = load_task_info(submission.task_id for submission in submissions.values())
+        
+        now = datetime.utcnow()
+        results = []
+        reviewed = []
+        task_status = {}
+        point_rows = []
+        total_deltas = defaultdict(int)
+        monthly_deltas = defaultdict(lambda: defaultdict(int))
+        
+        for item in reviews:
+            submission_id = item.get('id') if isinstance(item, dict) else None
+            submission = submissions.get(submission_id)
+            
+            if submission is None:
+                error = '提交记录不存在'
+            elif submission.review_status != 'pending':
+                # 包括同一请求中已经审核过的重复ID
+                error = '该提交已审核'
+            elif leased_by_other(submission, user_id_int, now):
+                error = '该提交正在由其他管理员审核'
+            else:
+                task_title, max_points = task_info[submission.task_id]
+                review_status, awarded_points, error = validate_review(item, max_points)
+            
+            if error:
+                results.append({'id': submission_id, 'success': False, 'error': error})
+                continue
+            
+            submission.review_status = review_status
+            submission.awarded_points = awarded_points
+            submission.review_comments = item.get('review_comments', '')
+            submission.reviewed_at = now
+            release_lease(submission)
+            
+            # 同一任务出现多次时以最后一条审核结果为准；拒绝的任务重新开放
+            task_status[submission.task_id] = 'completed' if review_status == 'approved' else 'open'
+            
+            if review_status == 'approved' and awarded_points > 0:
+                total_deltas[submission.user_id] += awarded_points
+                monthly_deltas[(submission.user_id, now.year, now.month)]['earned'] += awarded_points
+                point_rows.append({
+                    'user_id': submission.user_id,
+                    'task_id': submission.task_id,
+                    'points': awarded_points,
+                    'type': 'earned',
+                    'description': f'完成任务: {task_title}',
+                    'created_at': now
+                })
+            
+            reviewed.append(submission)
+            results.append({'id': submission_id, 'success': True})
+        
+        if reviewed:
+            # 提交在 flush 时一条 executemany 更新；任务状态、总积分、积分流水、月度汇总、通知事件
+            # 各用一条集合语句写入，与审核结果一起提交
+            completed = [tid for tid, status in task_status.items() if status == 'completed']
+            reopened = [tid for tid, status in task_status.items() if status == 'open']
+            if completed:
+                Task.query.filter(Task.id.in_(completed)).update(
+                    {'status': 'completed'}, synchronize_session=False)
+            if reopened:
+                Task.query.filter(Task.id.in_(reopened)).update(
+                    {'status': 'open', 'assigned_to': None}, synchronize_session=False)
+            add_total_points(total_deltas)
+            if point_rows:
+                db.session.execute(insert(PointRecord), point_rows)
+            add_monthly_points(monthly_deltas)
+            enqueue_many(db.session, 'submission_reviewed',
+                         [{'submission_id': submission.id} for submission in reviewed])
+            
+            # 提交前序列化，避免提交后逐行重新加载
+            user_names = load_user_names(submission.user_id for submission in reviewed)
+            files = load_submission_files(submission.id for submission in reviewed)
+            serialized = {
+                submission.id: submission.to_dict(task_info=task_info, user_names=user_names, files=files)
+                for submission in reviewed
+            }
+            db.session.commit()
+            for result in results:
+                if result['success']:
+                    result['submission'] = serialized[result['id']]
         
+        failed = len(results) - len(reviewed)
         return jsonify({
-            'submissions': [submission.to_dict() for submission in submissions]
+            'message': f'审核完成：成功 {len(reviewed)} 条，失败 {failed} 条',
+            'reviewed': len(reviewed),
+            'failed': failed,
+            'results': results
         }), 200
         
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'批量审核失败: {str(e)}'}), 500
+
+@submissions_bp.route('/submissions/next', methods=['POST'])
+@jwt_required()
+@require_admin
+def lease_next_submissions():
+    """
+    审核工作队列：把最早的待审核提交租给当前管理员（limit 个，默认 1），租约期内其他管理员领取不到
+    再次调用会续期自己已持有的租约
+    """
+    try:
+        user_id = get_jwt_identity()
+        
+        # 确保用户ID是整数类型用于数据库查询
+        if isinstance(user_id, str):
+            try:
+                user_id_int = int(user_id)
+            except ValueError:
+                return jsonify({'error': '无效的用户ID格式'}), 400
+        else:
+            user_id_int = user_id
+        
+        limit = parse_limit(request.args.get('limit'), default=1,
+                            maximum=current_app.config.get('SUBMISSION_LEASE_MAX_ITEMS', 20))
+        lease_seconds = current_app.config.get('SUBMISSION_LEASE_SECONDS', 600)
+        
+        submissions, expires_at = lease_submissions(user_id_int, limit, lease_seconds)
+        serialized = serialize_submissions(submissions)
+        db.session.commit()
+        
+        return jsonify({
+            'submissions': serialized,
+            'lease_expires_at': expires_at.isoformat() if submissions else None
+        }), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'领取待审核提交失败: {str(e)}'}), 500
+
+@submissions_bp.route('/submissions/<int:submission_id>/release', methods=['POST'])
+@jwt_required()
+@require_admin
+def release_submission(submission_id):
+    """放弃审核：释放自己持有的租约，提交回到队列"""
+    try:
+        user_id = get_jwt_identity()
+        
+        # 确保用户ID是整数类型用于数据库查询
+        if isinstance(user_id, str):
+            try:
+                user_id_int = int(user_id)
+            except ValueError:
+                return jsonify({'error': '无效的用户ID格式'}), 400
+        else:
+            user_id_int = user_id
+        
+        submission = TaskSubmission.query.get(submission_id)
+        if not submission:
+            return jsonify({'error': '提交记录不存在'}), 404
+        if submission.leased_by != user_id_int:
+            return jsonify({'error': '您没有持有此提交的租约'}), 409
+        
+        release_lease(submission)
+        db.session.commit()
+        
+        return jsonify({'message': '已释放'}), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'释放失败: {str(e)}'}), 500
+
+@submissions_bp.route('/submissions/my', methods=['GET'])
+@jwt_required()
+def get_my_submissions():
+    try:
+        user_id = get_jwt_identity()
+        
+        # 确保用户ID是整数类型用于数据库查询
+        if isinstance(user_id, str):
+            try:
+                user_id_int = int(user_id)
+            except ValueError:
+                return jsonify({'error': '无效的用户ID格式'}), 400
+        else:
+            user_id_int = user_id
+        
+        # 基础查询限定为本人的提交，user_id 参数只会进一步缩小范围
+        return submission_list_response(TaskSubmission.query.filter_by(user_id=user_id_int), user_id_int)
+        
     except Exception as e:
         return jsonify({'error': f'获取我的提交失败: {str(e)}'}), 500
 
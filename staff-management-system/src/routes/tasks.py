@@ -1,9 +1,19 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from datetime import datetime, date
-from src.models.user import db, User, Task, TaskSubmission, PointRecord
-from src.routes.notifications import create_submission_notification
+from datetime import datetime, date, timedelta
+from sqlalchemy import insert, select, or_, func
+from src.models.user import db, User, Task, TaskSubmission, SubmissionFile, PointRecord, Notification
+from src.utils.outbox import enqueue
+from src.utils.attachments import replace_submission_files
+from src.utils.review_lease import release_lease
+from src.utils.pagination import keyset_query, split_page, parse_limit, parse_bool
+from src.utils.conditional import query_fingerprint, request_etag, is_not_modified, not_modified_response, conditional_json
+from src.utils.serializers import serialize_tasks
+from src.utils.unread import adjust_unread_counts, unread_deltas
+from src.utils.monthly_points import add_monthly_points, add_total_points, point_deltas, earned_by_user, finalized_months
 from functools import wraps
+import csv
+import io
 import json
 
 tasks_bp = Blueprint('tasks', __name__)
@@ -60,6 +70,14 @@ def get_tasks():
         # 获取查询参数
         status = request.args.get('status')
         assigned_to_me = request.args.get('assigned_to_me', 'false').lower() == 'true'
+        assignee = request.args.get('assigned_to', type=int)
+        publisher = request.args.get('publisher')
+        created_from = request.args.get('created_from')
+        created_to = request.args.get('created_to')
+        # 兼容旧客户端：paginate=false 时返回完整列表
+        paginate = parse_bool(request.args.get('paginate'), default=True)
+        cursor = request.args.get('cursor')
+        limit = parse_limit(request.args.get('limit'))
         
         query = Task.query
         
@@ -72,45 +90,111 @@ def get_tasks():
                 query = query.filter_by(status='open')
         
         if status:
-            query = query.filter_by(status=status)
+            # 支持逗号分隔的多个状态
+            statuses = [s for s in status.split(',') if s]
+            query = query.filter(Task.status.in_(statuses))
         
-        tasks = query.order_by(Task.created_at.desc()).all()
+        if assignee:
+            query = query.filter(Task.assigned_to == assignee)
         
-        return jsonify({
-            'tasks': [task.to_dict() for task in tasks]
-        }), 200
+        if publisher:
+            query = query.filter(Task.publisher_name == publisher)
+        
+        try:
+            if created_from:
+                query = query.filter(Task.created_at >= datetime.strptime(created_from, '%Y-%m-%d'))
+            if created_to:
+                # 结束日期包含当天
+                query = query.filter(Task.created_at < datetime.strptime(created_to, '%Y-%m-%d') + timedelta(days=1))
+        except ValueError:
+            return jsonify({'error': '日期格式错误，请使用 YYYY-MM-DD 格式'}), 400
+        
+        if paginate:
+            try:
+                page_query = keyset_query(query, Task.created_at, Task.id, cursor, limit)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+        else:
+            page_query = query.order_by(Task.created_at.desc(), Task.id.desc())
+        
+        # 条件 GET：数据没有变化时直接返回 304，不加载任务
+        # 响应中包含创建者和接受者的用户名
+        count, last_modified, id_sum = query_fingerprint(
+            page_query, Task.id, Task.updated_at,
+            related=[(Task.created_by, User), (Task.assigned_to, User)]
+        )
+        etag = request_etag(user_id_int, count, last_modified, id_sum)
+        if is_not_modified(etag):
+            return not_modified_response(etag, last_modified)
+        
+        if not paginate:
+            return conditional_json({
+                'tasks': serialize_tasks(page_query.all())
+            }, etag, last_modified)
+        
+        tasks, next_cursor = split_page(page_query.all(), Task.created_at, Task.id, limit)
+        
+        return conditional_json({
+            'tasks': serialize_tasks(tasks),
+            'next_cursor': next_cursor,
+            'has_more': next_cursor is not None,
+            'limit': limit
+        }, etag, last_modified)
         
     except Exception as e:
         return jsonify({'error': f'获取任务列表失败: {str(e)}'}), 500
 
+TASK_REQUIRED_FIELDS = ['title', 'description', 'publisher_name', 'start_date', 'end_date', 'max_points']
+
+# 批量导入：每批 executemany 插入并提交的行数、最多返回的错误条数
+IMPORT_BATCH_SIZE = 1000
+IMPORT_MAX_ERRORS = 1000
+
+def validate_task_payload(data):
+    """校验创建任务的字段，返回 (字段字典, 错误信息)"""
+    # 验证必需字段
+    for field in TASK_REQUIRED_FIELDS:
+        if not data.get(field):
+            return None, f'{field} 是必需的'
+    
+    # 解析日期
+    try:
+        start_date = datetime.strptime(data['start_date'], '%Y-%m-%d').date()
+        end_date = datetime.strptime(data['end_date'], '%Y-%m-%d').date()
+    except (ValueError, TypeError):
+        return None, '日期格式错误，请使用 YYYY-MM-DD 格式'
+    
+    if end_date < start_date:
+        return None, '结束日期不能早于开始日期'
+    
+    # 确保积分是整数类型
+    try:
+        max_points = int(data['max_points'])
+    except (ValueError, TypeError):
+        return None, '积分必须是有效的数字'
+    
+    if max_points <= 0:
+        return None, '积分必须大于0'
+    
+    return {
+        'title': data['title'],
+        'description': data['description'],
+        'publisher_name': data['publisher_name'],
+        'start_date': start_date,
+        'end_date': end_date,
+        'max_points': max_points
+    }, None
+
 @tasks_bp.route('/tasks', methods=['POST'])
 @jwt_required()
 @require_admin
 def create_task():
     try:
-        data = request.get_json()
-        
-        # 验证必需字段
-        required_fields = ['title', 'description', 'publisher_name', 'start_date', 'end_date', 'max_points']
-        for field in required_fields:
-            if not data.get(field):
-                return jsonify({'error': f'{field} 是必需的'}), 400
-        
-        # 解析日期
-        start_date = datetime.strptime(data['start_date'], '%Y-%m-%d').date()
-        end_date = datetime.strptime(data['end_date'], '%Y-%m-%d').date()
-        
-        if end_date < start_date:
-            return jsonify({'error': '结束日期不能早于开始日期'}), 400
+        data = request.get_json() or {}
         
-        # 确保积分是整数类型
-        try:
-            max_points = int(data['max_points'])
-        except (ValueError, TypeError):
-            return jsonify({'error': '积分必须是有效的数字'}), 400
-        
-        if max_points <= 0:
-            return jsonify({'error': '积分必须大于0'}), 400
+        fields, error = validate_task_payload(data)
+        if error:
+            return jsonify({'error': error}), 400
         
         user_id = get_jwt_identity()
         
@@ -123,15 +207,7 @@ def create_task():
         else:
             user_id_int = user_id
         
-        task = Task(
-            title=data['title'],
-            description=data['description'],
-            publisher_name=data['publisher_name'],
-            start_date=start_date,
-            end_date=end_date,
-            max_points=max_points,
-            created_by=user_id_int
-        )
+        task = Task(created_by=user_id_int, **fields)
         
         db.session.add(task)
         db.session.commit()
@@ -141,12 +217,105 @@ def create_task():
             'task': task.to_dict()
         }), 201
         
-    except ValueError as e:
-        return jsonify({'error': '日期格式错误，请使用 YYYY-MM-DD 格式'}), 400
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': f'创建任务失败: {str(e)}'}), 500
 
+def _iter_import_rows(stream, fmt):
+    """逐行读取导入数据，产出 (行号, 字段字典或None, 错误信息)"""
+    text_stream = io.TextIOWrapper(io.BufferedReader(stream), encoding='utf-8-sig', newline='')
+    
+    if fmt == 'csv':
+        reader = csv.DictReader(text_stream)
+        for row in reader:
+            yield reader.line_num, row, None
+        return
+    
+    for line_no, line in enumerate(text_stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            yield line_no, None, 'JSON 格式错误'
+            continue
+        if not isinstance(row, dict):
+            yield line_no, None, '每行必须是一个 JSON 对象'
+            continue
+        yield line_no, row, None
+
+@tasks_bp.route('/tasks/bulk', methods=['POST'])
+@jwt_required()
+@require_admin
+def bulk_create_tasks():
+    """批量导入任务（CSV 或 NDJSON），流式读取、分批插入，返回逐行错误"""
+    try:
+        user_id = get_jwt_identity()
+        
+        # 确保用户ID是整数类型用于数据库查询
+        if isinstance(user_id, str):
+            try:
+                user_id_int = int(user_id)
+            except ValueError:
+                return jsonify({'error': '无效的用户ID格式'}), 400
+        else:
+            user_id_int = user_id
+        
+        fmt = request.args.get('format')
+        if not fmt:
+            content_type = (request.mimetype or '').lower()
+            fmt = 'csv' if content_type in ('text/csv', 'application/csv') else 'ndjson'
+        if fmt not in ('csv', 'ndjson'):
+            return jsonify({'error': 'format 必须是 csv 或 ndjson'}), 400
+        
+        # 导入文件可以超过普通请求的大小限制
+        request.max_content_length = current_app.config.get('TASK_IMPORT_MAX_CONTENT_LENGTH')
+        
+        created = 0
+        failed = 0
+        errors = []
+        batch = []
+        
+        def flush():
+            nonlocal created
+            if batch:
+                db.session.execute(insert(Task), batch)
+                db.session.commit()
+                created += len(batch)
+                batch.clear()
+        
+        for line_no, row, error in _iter_import_rows(request.stream, fmt):
+            if row is not None:
+                fields, error = validate_task_payload(row)
+            if error:
+                failed += 1
+                if len(errors) < IMPORT_MAX_ERRORS:
+                    errors.append({'line': line_no, 'error': error})
+                continue
+            
+            fields['created_by'] = user_id_int
+            batch.append(fields)
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                flush()
+        
+        flush()
+        
+        return jsonify({
+            'message': f'导入完成：成功 {created} 条，失败 {failed} 条',
+            'created': created,
+            'failed': failed,
+            'errors': errors,
+            'errors_truncated': failed > len(errors)
+        }), 200
+        
+    except UnicodeDecodeError:
+        db.session.rollback()
+        return jsonify({'error': '文件编码错误，请使用 UTF-8'}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'批量导入任务失败: {str(e)}'}), 500
+
 @tasks_bp.route('/tasks/<int:task_id>', methods=['GET'])
 @jwt_required()
 def get_task(task_id):
@@ -155,9 +324,19 @@ def get_task(task_id):
         if not task:
             return jsonify({'error': '任务不存在'}), 404
         
-        return jsonify({
+        # 响应中包含创建者和接受者的用户名
+        user_ids = [uid for uid in (task.created_by, task.assigned_to) if uid is not None]
+        users_modified = db.session.query(func.max(User.updated_at)).filter(User.id.in_(user_ids)).scalar() \
+            if user_ids else None
+        last_modified = max(value for value in (task.updated_at, users_modified, task.created_at) if value is not None)
+        
+        etag = request_etag(None, task.id, task.updated_at, task.assigned_to, users_modified)
+        if is_not_modified(etag, last_modified):
+            return not_modified_response(etag, last_modified)
+        
+        return conditional_json({
             'task': task.to_dict()
-        }), 200
+        }, etag, last_modified)
         
     except Exception as e:
         return jsonify({'error': f'获取任务详情失败: {str(e)}'}), 500
@@ -219,25 +398,28 @@ def assign_task(task_id):
         else:
             user_id_int = user_id
             
-        task = Task.query.get(task_id)
-        
-        if not task:
-            return jsonify({'error': '任务不存在'}), 404
-        
-        if task.status != 'open':
-            return jsonify({'error': '任务不可接受'}), 400
-        
-        if task.assigned_to:
-            return jsonify({'error': '任务已被其他人接受'}), 400
-        
-        # 检查任务是否已过期
-        if task.end_date < date.today():
+        # 原子抢单：条件更新，只有一个请求能更新成功，以影响行数判断结果
+        claimed = Task.query.filter(
+            Task.id == task_id,
+            Task.status == 'open',
+            Task.assigned_to.is_(None),
+            Task.end_date >= date.today()
+        ).update({'assigned_to': user_id_int, 'status': 'assigned'}, synchronize_session=False)
+        
+        if claimed != 1:
+            db.session.rollback()
+            # 抢单失败，读取当前状态给出具体原因
+            task = Task.query.get(task_id)
+            if not task:
+                return jsonify({'error': '任务不存在'}), 404
+            if task.status != 'open':
+                return jsonify({'error': '任务不可接受'}), 400
+            if task.assigned_to:
+                return jsonify({'error': '任务已被其他人接受'}), 400
             return jsonify({'error': '任务已过期'}), 400
         
-        task.assigned_to = user_id_int
-        task.status = 'assigned'
-        
         db.session.commit()
+        task = Task.query.get(task_id)
         
         return jsonify({
             'message': '任务接受成功',
@@ -276,6 +458,10 @@ def submit_task(task_id):
         
         data = request.get_json()
         
+        file_paths = data.get('file_paths', [])
+        if not isinstance(file_paths, list):
+            return jsonify({'error': 'file_paths 必须是数组'}), 400
+        
         # 检查是否已有提交记录
         existing_submission = TaskSubmission.query.filter_by(
             task_id=task_id, 
@@ -285,25 +471,27 @@ def submit_task(task_id):
         if existing_submission:
             # 更新现有提交
             existing_submission.description = data.get('description', '')
-            existing_submission.file_paths = json.dumps(data.get('file_paths', []))
             existing_submission.submitted_at = datetime.utcnow()
             existing_submission.review_status = 'pending'
+            release_lease(existing_submission)
             submission = existing_submission
         else:
             # 创建新提交
             submission = TaskSubmission(
                 task_id=task_id,
                 user_id=user_id_int,
-                description=data.get('description', ''),
-                file_paths=json.dumps(data.get('file_paths', []))
+                description=data.get('description', '')
             )
             db.session.add(submission)
         
         task.status = 'submitted'
-        db.session.commit()
+        db.session.flush()
+        # 附件写入 submission_file，重新提交时替换原有附件
+        replace_submission_files(db.session, submission.id, file_paths)
         
-        # 创建通知给管理员
-        create_submission_notification(submission)
+        # 通知管理员：与提交写在同一事务中，由 outbox worker 在后台发送
+        enqueue(db.session, 'submission_submitted', {'submission_id': submission.id})
+        db.session.commit()
         
         return jsonify({
             'message': '任务提交成功',
@@ -314,6 +502,35 @@ def submit_task(task_id):
         db.session.rollback()
         return jsonify({'error': f'提交任务失败: {str(e)}'}), 500
 
+# 批量删除/归档一次最多处理的任务数
+BULK_DELETE_MAX_IDS = 1000
+
+def delete_tasks_cascade(task_ids):
+    """
+    按集合删除任务及其关联数据（通知、提交及其附件、积分记录）
+    无论关联多少行，都只执行固定条数的语句，不提交事务
+    被删除的积分同时从月度汇总和用户总积分中扣除；已确认月份的工资快照（salary_snapshot）
+    是已发放工资的记录，保持不变，返回 (删除的任务数, 涉及的已确认月份 ['YYYY-MM'])
+    """
+    submission_ids = select(TaskSubmission.id).where(TaskSubmission.task_id.in_(task_ids))
+    
+    # 与任务或任务提交相关的通知，先扣减其中未读通知的计数
+    related = or_(
+        Notification.related_task_id.in_(task_ids),
+        Notification.related_submission_id.in_(submission_ids)
+    )
+    adjust_unread_counts(unread_deltas(related))
+    Notification.query.filter(related).delete(synchronize_session=False)
+    
+    SubmissionFile.query.filter(SubmissionFile.submission_id.in_(submission_ids)).delete(synchronize_session=False)
+    TaskSubmission.query.filter(TaskSubmission.task_id.in_(task_ids)).delete(synchronize_session=False)
+    deltas = point_deltas(PointRecord.task_id.in_(task_ids))
+    add_monthly_points(deltas)
+    add_total_points(earned_by_user(deltas))
+    PointRecord.query.filter(PointRecord.task_id.in_(task_ids)).delete(synchronize_session=False)
+    deleted = Task.query.filter(Task.id.in_(task_ids)).delete(synchronize_session=False)
+    return deleted, finalized_months(deltas)
+
 @tasks_bp.route('/tasks/<int:task_id>', methods=['DELETE'])
 @jwt_required()
 @require_admin
@@ -324,34 +541,66 @@ def delete_task(task_id):
             return jsonify({'error': '任务不存在'}), 404
         
         # 管理员可以删除任何任务，包括已完成的
-        # 先删除相关的通知记录
-        from src.models.user import Notification
-        notifications = Notification.query.filter_by(related_task_id=task_id).all()
-        for notification in notifications:
-            db.session.delete(notification)
-        
-        # 删除相关的提交记录
-        submissions = TaskSubmission.query.filter_by(task_id=task_id).all()
-        for submission in submissions:
-            # 删除与提交相关的通知
-            submission_notifications = Notification.query.filter_by(related_submission_id=submission.id).all()
-            for notification in submission_notifications:
-                db.session.delete(notification)
-            db.session.delete(submission)
-        
-        # 删除相关的积分记录
-        point_records = PointRecord.query.filter_by(task_id=task_id).all()
-        for record in point_records:
-            db.session.delete(record)
-        
-        # 最后删除任务
-        db.session.delete(task)
+        # 相关的通知、提交记录、积分记录一并删除
+        _, finalized = delete_tasks_cascade([task_id])
+        db.session.commit()
+        
+        return jsonify({
+            'message': '任务删除成功',
+            'finalized_months': finalized
+        }), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'删除任务失败: {str(e)}'}), 500
+
+@tasks_bp.route('/tasks/bulk-delete', methods=['POST'])
+@jwt_required()
+@require_admin
+def bulk_delete_tasks():
+    """批量删除或归档任务，单个事务内完成"""
+    try:
+        data = request.get_json() or {}
+        mode = data.get('mode', 'delete')
+        
+        if mode not in ('delete', 'archive'):
+            return jsonify({'error': 'mode 必须是 delete 或 archive'}), 400
+        
+        try:
+            task_ids = sorted({int(task_id) for task_id in data.get('ids', [])})
+        except (ValueError, TypeError):
+            return jsonify({'error': 'ids 必须是任务ID列表'}), 400
+        
+        if not task_ids:
+            return jsonify({'error': 'ids 不能为空'}), 400
+        
+        if len(task_ids) > BULK_DELETE_MAX_IDS:
+            return jsonify({'error': f'一次最多处理 {BULK_DELETE_MAX_IDS} 个任务'}), 400
+        
+        found_ids = [row.id for row in db.session.query(Task.id).filter(Task.id.in_(task_ids)).all()]
+        not_found = sorted(set(task_ids) - set(found_ids))
+        
+        if mode == 'delete':
+            affected, finalized = delete_tasks_cascade(found_ids) if found_ids else (0, [])
+            message = f'已删除 {affected} 个任务'
+        else:
+            # 归档只修改状态，保留提交和积分历史
+            affected = Task.query.filter(Task.id.in_(found_ids)).update(
+                {'status': 'archived'}, synchronize_session=False
+            ) if found_ids else 0
+            finalized = []
+            message = f'已归档 {affected} 个任务'
+        
         db.session.commit()
         
         return jsonify({
-            'message': '任务删除成功'
+            'message': message,
+            'mode': mode,
+            'affected': affected,
+            'not_found': not_found,
+            'finalized_months': finalized
         }), 200
         
     except Exception as e:
         db.session.rollback()
-        return jsonify({'error': f'删除任务失败: {str(e)}'}), 500
\ No newline at end of file
+        return jsonify({'error': f'批量处理任务失败: {str(e)}'}), 500
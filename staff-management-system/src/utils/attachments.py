@@ -0,0 +1,78 @@
+"""
+提交附件（submission_file）
+提交时为每个文件写入一行：路径、大小、类型和 sha256，列表接口按提交ID批量读取，不再解析 JSON；
+按路径的索引可以反查哪些提交引用了某个文件。
+上传目录中找不到的文件（如外部链接）只记录路径和按扩展名推断的类型
+"""
+
+import hashlib
+import json
+import mimetypes
+import os
+from sqlalchemy import insert, delete
+from src.models.user import SubmissionFile
+
+UPLOAD_URL_PREFIX = '/uploads/'
+UPLOAD_DIR = os.path.join(os.path.dirname(__file__), '..', 'uploads')
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def _local_file(path):
+    """上传接口返回的路径对应的本地文件，不在上传目录中时返回 None"""
+    if not path.startswith(UPLOAD_URL_PREFIX):
+        return None
+    filename = path[len(UPLOAD_URL_PREFIX):]
+    if not filename or '/' in filename or '\\' in filename or filename in ('.', '..'):
+        return None
+    file_path = os.path.join(UPLOAD_DIR, filename)
+    return file_path if os.path.isfile(file_path) else None
+
+
+def file_metadata(path):
+    """返回附件的 {path, size, content_type, sha256}"""
+    metadata = {
+        'path': path,
+        'size': None,
+        'content_type': mimetypes.guess_type(path)[0],
+        'sha256': None
+    }
+    file_path = _local_file(path)
+    if file_path:
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+                digest.update(chunk)
+        metadata['size'] = os.path.getsize(file_path)
+        metadata['sha256'] = digest.hexdigest()
+    return metadata
+
+
+def attachment_rows(submission_id, paths):
+    """把路径列表转换为 submission_file 的行，忽略空值、非字符串和重复路径"""
+    rows = []
+    seen = set()
+    for path in paths or []:
+        if not isinstance(path, str) or not path.strip() or path in seen:
+            continue
+        seen.add(path)
+        rows.append({'submission_id': submission_id, **file_metadata(path)})
+    return rows
+
+
+def parse_file_paths(raw):
+    """解析旧的 file_paths JSON 文本，格式错误时返回空列表"""
+    try:
+        paths = json.loads(raw) if raw else []
+    except ValueError:
+        return []
+    return paths if isinstance(paths, list) else []
+
+
+def replace_submission_files(session, submission_id, paths):
+    """用新的路径列表替换提交的附件，不提交事务，返回附件行数"""
+    session.execute(delete(SubmissionFile).where(SubmissionFile.submission_id == submission_id))
+    rows = attachment_rows(submission_id, paths)
+    if rows:
+        session.execute(insert(SubmissionFile), rows)
+    return len(rows)
@@ -0,0 +1,82 @@
+"""
+进程内短时缓存
+写入指定模型的事务提交后自动失效（回滚不失效），TTL 只作为兜底。
+提交前失效没有意义：提交前并发读取到的仍是旧数据，会被重新写回缓存。
+缓存每次清空时递增代数，计算开始后缓存被清空过的结果不再写回，避免慢查询把旧值放回去
+"""
+
+import threading
+import time
+from sqlalchemy import event
+
+
+class TTLCache:
+    """线程安全的键值缓存，每个条目在 ttl 秒后过期"""
+
+    def __init__(self, ttl=30):
+        self.ttl = ttl
+        self._data = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            return value
+
+    def set(self, key, value, ttl=None, generation=None):
+        """generation：计算开始时的代数，期间缓存被清空过则不写入"""
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._data[key] = (time.monotonic() + (ttl or self.ttl), value)
+
+    def get_or_compute(self, key, compute, ttl=None):
+        value = self.get(key)
+        if value is None:
+            generation = self._generation
+            value = compute()
+            self.set(key, value, ttl, generation)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._generation += 1
+
+
+def invalidate_on_write(session, cache, model_classes):
+    """session 写入任一指定模型的事务提交后清空缓存"""
+    model_classes = tuple(model_classes)
+    tables = {model.__table__ for model in model_classes}
+    dirty_key = ('cache_dirty', id(cache))
+
+    def _touches(instances):
+        return any(isinstance(obj, model_classes) for obj in instances)
+
+    @event.listens_for(session, 'after_flush')
+    def _after_flush(sess, flush_context):
+        if _touches(sess.new) or _touches(sess.dirty) or _touches(sess.deleted):
+            sess.info[dirty_key] = True
+
+    @event.listens_for(session, 'do_orm_execute')
+    def _do_orm_execute(orm_execute_state):
+        # Query.update()/delete() 以及 session.execute(insert/update/delete) 不经过 flush，按目标表判断
+        if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+            if getattr(orm_execute_state.statement, 'table', None) in tables:
+                orm_execute_state.session.info[dirty_key] = True
+
+    @event.listens_for(session, 'after_commit')
+    def _after_commit(sess):
+        if sess.info.pop(dirty_key, False):
+            cache.clear()
+
+    @event.listens_for(session, 'after_rollback')
+    def _after_rollback(sess):
+        sess.info.pop(dirty_key, None)
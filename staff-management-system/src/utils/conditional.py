@@ -0,0 +1,80 @@
+"""
+条件 GET（ETag / Last-Modified）
+ETag 由 (行数, max(updated_at), sum(id)) 加上请求参数计算，只需要一次聚合查询；
+max(updated_at) 同时覆盖响应中展示的关联行（任务标题、用户名等），关联数据修改后 ETag 也会变化。
+客户端带 If-None-Match 命中时直接返回 304，不加载也不序列化任何记录。
+列表只按 ETag 判断：删除一行后 max(updated_at) 可能不变，If-Modified-Since 会误判为未修改
+"""
+
+import hashlib
+from flask import request, make_response, jsonify
+from sqlalchemy import func
+from sqlalchemy.orm import aliased
+from src.models.user import db
+
+
+def query_fingerprint(query, id_column, updated_column, related=()):
+    """
+    对查询将返回的记录集合做聚合，返回 (行数, 最后修改时间, id 之和)
+    related: [(外键列, 关联模型)]，响应中包含关联行的字段时传入，最后修改时间取所有关联行中的最大值
+    """
+    columns = [id_column.label('id'), updated_column.label('updated_at')]
+    columns += [fk.label(f'fk_{i}') for i, (fk, _) in enumerate(related)]
+    rows = query.with_entities(*columns).subquery()
+
+    aggregates = [func.count(rows.c.id), func.max(rows.c.updated_at), func.sum(rows.c.id)]
+    joins = []
+    for i, (_, model) in enumerate(related):
+        target = aliased(model)
+        joins.append((target, target.id == rows.c[f'fk_{i}']))
+        aggregates.append(func.max(target.updated_at))
+
+    fingerprint = db.session.query(*aggregates).select_from(rows)
+    for target, on in joins:
+        fingerprint = fingerprint.outerjoin(target, on)
+    count, last_modified, id_sum, *related_modified = fingerprint.one()
+
+    modified = [value for value in (last_modified, *related_modified) if value is not None]
+    return count, (max(modified) if modified else None), id_sum
+
+
+def make_etag(*parts):
+    """根据任意可 repr 的部分生成强 ETag 值（不含引号）"""
+    raw = '|'.join(repr(part) for part in parts)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def request_etag(user_id, *parts):
+    """ETag 中包含用户和完整查询参数，不同用户、不同筛选条件互不影响"""
+    return make_etag(request.path, request.query_string, user_id, *parts)
+
+
+def is_not_modified(etag, last_modified=None):
+    """
+    判断客户端缓存是否仍然有效
+    last_modified 只应由单条资源传入（列表的 If-Modified-Since 无法反映删除）
+    """
+    if request.if_none_match:
+        return request.if_none_match.contains(etag)
+    if last_modified is not None and request.if_modified_since is not None:
+        # HTTP 时间只精确到秒
+        return last_modified.replace(microsecond=0) <= request.if_modified_since.replace(tzinfo=None)
+    return False
+
+
+def _set_validators(response, etag, last_modified):
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    # 浏览器每次都向服务器验证缓存，命中时只传输 304
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def not_modified_response(etag, last_modified=None):
+    return _set_validators(make_response('', 304), etag, last_modified)
+
+
+def conditional_json(body, etag, last_modified=None, status=200):
+    """带 ETag / Last-Modified 的 JSON 响应"""
+    return _set_validators(make_response(jsonify(body), status), etag, last_modified)
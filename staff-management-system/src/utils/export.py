@@ -0,0 +1,173 @@
+"""
+流式导出（CSV / XLSX）
+数据行由生成器逐行产生（查询使用 yield_per 分批读取），边写边发送，内存占用与行数无关。
+文件开头可以带若干行汇总信息（如利润池、积分价值），之后是表头和数据行。
+CSV 在客户端支持时使用 gzip 传输；XLSX 本身是 zip 压缩包，不再压缩。
+"""
+
+import csv
+import io
+import zipfile
+import zlib
+from urllib.parse import quote
+from xml.sax.saxutils import escape
+from flask import Response, request, stream_with_context
+
+EXPORT_FORMATS = ('csv', 'xlsx')
+
+# 每积累这么多行输出一次
+CHUNK_ROWS = 500
+
+
+class _Sink:
+    """只支持 write 的输出缓冲，供 csv / zipfile 写入后分块取出"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _csv_chunks(summary, columns, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write('\ufeff')  # BOM，Excel 打开中文不乱码
+
+    for label, value in summary:
+        writer.writerow([label, value])
+    if summary:
+        writer.writerow([])
+    writer.writerow([title for _, title in columns])
+
+    for i, row in enumerate(rows, 1):
+        writer.writerow([row.get(key) for key, _ in columns])
+        if i % CHUNK_ROWS == 0:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode('utf-8')
+
+
+def _gzip(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31：gzip 格式
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def _xlsx_cell(value):
+    if value is None:
+        return '<c/>'
+    if isinstance(value, bool):
+        return f'<c t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float)):
+        return f'<c><v>{value}</v></c>'
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{escape(str(value))}</t></is></c>'
+
+
+def _xlsx_row(values):
+    return '<row>' + ''.join(_xlsx_cell(value) for value in values) + '</row>'
+
+
+_XLSX_STATIC = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Sheet1" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    ),
+}
+
+
+def _xlsx_chunks(summary, columns, rows):
+    """最小化的 XLSX（内联字符串，无样式），工作表 XML 边生成边压缩写出"""
+    sink = _Sink()
+    with zipfile.ZipFile(sink, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, content in _XLSX_STATIC.items():
+            archive.writestr(name, content)
+        yield sink.take()
+
+        with archive.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write((
+                '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+            ).encode('utf-8'))
+            lines = [_xlsx_row([label, value]) for label, value in summary]
+            if summary:
+                lines.append('<row/>')
+            lines.append(_xlsx_row([title for _, title in columns]))
+            sheet.write(''.join(lines).encode('utf-8'))
+
+            lines = []
+            for i, row in enumerate(rows, 1):
+                lines.append(_xlsx_row([row.get(key) for key, _ in columns]))
+                if i % CHUNK_ROWS == 0:
+                    sheet.write(''.join(lines).encode('utf-8'))
+                    lines = []
+                    yield sink.take()
+            lines.append('</sheetData></worksheet>')
+            sheet.write(''.join(lines).encode('utf-8'))
+    yield sink.take()
+
+
+def export_response(filename, fmt, columns, rows, summary=()):
+    """
+    流式导出响应
+    columns: [(字典键, 表头)]；rows: 产生 dict 的可迭代对象；summary: [(名称, 值)] 写在表头之前
+    """
+    if fmt == 'xlsx':
+        chunks = _xlsx_chunks(summary, columns, rows)
+        mimetype = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        headers = {}
+    else:
+        chunks = _csv_chunks(summary, columns, rows)
+        mimetype = 'text/csv; charset=utf-8'
+        headers = {'Vary': 'Accept-Encoding'}
+        if 'gzip' in request.accept_encodings:
+            chunks = _gzip(chunks)
+            headers['Content-Encoding'] = 'gzip'
+
+    headers['Content-Disposition'] = f"attachment; filename*=UTF-8''{quote(f'{filename}.{fmt}')}"
+    headers['X-Accel-Buffering'] = 'no'  # 关闭反向代理缓冲，边生成边发送
+    # 生成器在请求上下文中执行，数据库会话在导出结束前保持可用
+    return Response(stream_with_context(chunks), mimetype=mimetype, headers=headers)
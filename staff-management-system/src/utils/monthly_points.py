@@ -0,0 +1,97 @@
+"""
+月度积分汇总（monthly_point_total）
+每写入或删除一条积分记录，都在同一事务中按 (年, 月, 用户) 累加对应类型的积分；
+月度统计和工资计算只需要按主键范围读取当月各用户的一行，与积分流水的总量无关。
+汇总出现偏差时用 maintenance.py rebuild-monthly-points 重建
+"""
+
+from collections import defaultdict
+from datetime import datetime
+from sqlalchemy import func, extract, bindparam, tuple_
+from src.models.user import db, User, PointRecord, MonthlyPointTotal, MonthlySetting
+from src.database.dialect import dialect_insert
+
+# 积分记录类型 -> 汇总列
+POINT_COLUMNS = {'earned': 'earned', 'bonus': 'bonus', 'deduction': 'deduction'}
+
+
+def add_monthly_points(deltas):
+    """
+    按 {(用户ID, 年, 月): {类型: 增量}} 累加月度汇总，一条 INSERT ... ON CONFLICT DO UPDATE，不提交事务
+    """
+    now = datetime.utcnow()
+    rows = []
+    for (user_id, year, month), by_type in sorted(deltas.items()):
+        row = {'user_id': user_id, 'year': year, 'month': month, 'updated_at': now}
+        for point_type, column in POINT_COLUMNS.items():
+            row[column] = by_type.get(point_type, 0)
+        rows.append(row)
+    if not rows:
+        return
+
+    table = MonthlyPointTotal.__table__
+    stmt = dialect_insert(MonthlyPointTotal).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['year', 'month', 'user_id'],
+        set_={
+            **{column: table.c[column] + stmt.excluded[column] for column in POINT_COLUMNS.values()},
+            'updated_at': stmt.excluded.updated_at
+        }
+    )
+    db.session.execute(stmt)
+
+
+def record_points(user_id, point_type, points, created_at):
+    """新增一条积分记录时调用"""
+    add_monthly_points({(user_id, created_at.year, created_at.month): {point_type: points}})
+
+
+def point_deltas(*criteria):
+    """删除积分记录前调用：按 (用户, 年, 月, 类型) 统计将被删除的积分，返回负增量"""
+    year = extract('year', PointRecord.created_at)
+    month = extract('month', PointRecord.created_at)
+    rows = db.session.query(
+        PointRecord.user_id, year, month, PointRecord.type, func.sum(PointRecord.points)
+    ).filter(*criteria).group_by(PointRecord.user_id, year, month, PointRecord.type).all()
+
+    deltas = defaultdict(dict)
+    for user_id, row_year, row_month, point_type, points in rows:
+        deltas[(user_id, int(row_year), int(row_month))][point_type] = -int(points or 0)
+    return deltas
+
+
+def add_total_points(deltas):
+    """按 {用户ID: 增量} 累加用户总积分（user.total_points），一条 executemany 语句，不提交事务"""
+    # 按用户ID排序加锁，避免并发事务之间死锁
+    params = [{'uid': user_id, 'delta': delta} for user_id, delta in sorted(deltas.items()) if delta]
+    if not params:
+        return
+
+    users = User.__table__
+    db.session.execute(
+        users.update().where(users.c.id == bindparam('uid')).values(
+            total_points=users.c.total_points + bindparam('delta'),
+            updated_at=users.c.updated_at  # 总积分不在列表中展示，不使列表 ETag 失效
+        ),
+        params
+    )
+
+
+def earned_by_user(deltas):
+    """把月度增量 {(用户, 年, 月): {类型: 增量}} 汇总为总积分增量 {用户: 增量}（总积分只计 earned）"""
+    totals = defaultdict(int)
+    for (user_id, _, _), by_type in deltas.items():
+        totals[user_id] += by_type.get('earned', 0)
+    return totals
+
+
+def finalized_months(deltas):
+    """增量涉及的已确认月份，返回 ['YYYY-MM']；这些月份的工资快照不会随之改变"""
+    months = {(year, month) for (_, year, month) in deltas}
+    if not months:
+        return []
+    rows = db.session.query(MonthlySetting.year, MonthlySetting.month).filter(
+        MonthlySetting.is_finalized == True,
+        tuple_(MonthlySetting.year, MonthlySetting.month).in_(sorted(months))
+    ).all()
+    return sorted(f'{year:04d}-{month:02d}' for year, month in rows)
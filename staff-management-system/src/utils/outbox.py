@@ -0,0 +1,142 @@
+"""
+事务性 outbox
+业务写入时在同一事务中登记事件（enqueue），请求提交后立即返回；
+后台 worker 分批取出事件执行对应的处理函数，失败按指数退避重试。
+事件至少执行一次，处理函数必须是幂等的。
+PostgreSQL 上用 FOR UPDATE SKIP LOCKED 领取，多个 worker 不会重复处理同一批事件。
+"""
+
+import json
+import threading
+from datetime import datetime, timedelta
+from sqlalchemy import event, insert
+from src.models.user import db, OutboxEvent
+
+HANDLERS = {}
+
+# 重试退避：第 n 次失败后等待 BACKOFF_BASE_SECONDS * 2^(n-1) 秒，最长 BACKOFF_MAX_SECONDS
+BACKOFF_BASE_SECONDS = 5
+BACKOFF_MAX_SECONDS = 3600
+
+
+def outbox_handler(topic):
+    """注册一个事件处理函数，处理函数接收事件的 payload（dict），不提交事务"""
+    def decorator(handler):
+        HANDLERS[topic] = handler
+        return handler
+    return decorator
+
+
+def enqueue(session, topic, payload):
+    """在当前事务中登记一个事件，随业务写入一起提交"""
+    session.add(OutboxEvent(topic=topic, payload=json.dumps(payload)))
+
+
+def enqueue_many(session, topic, payloads):
+    """批量登记同一主题的事件，一条多行 INSERT（不经过 ORM flush），随业务写入一起提交"""
+    if not payloads:
+        return
+    session.execute(insert(OutboxEvent), [
+        {'topic': topic, 'payload': json.dumps(payload)} for payload in payloads
+    ])
+    session.info['outbox_pending'] = True
+
+
+def _backoff(attempts):
+    return timedelta(seconds=min(BACKOFF_BASE_SECONDS * 2 ** (attempts - 1), BACKOFF_MAX_SECONDS))
+
+
+def drain(batch_size=100, max_attempts=8):
+    """
+    处理所有到期的待处理事件，返回处理的事件数
+    每批一个事务：每个事件在自己的 SAVEPOINT 中执行，成功的删除，失败的记录错误并推迟重试，
+    超过 max_attempts 次标记为 failed 留待人工检查
+    """
+    processed = 0
+    while True:
+        now = datetime.utcnow()
+        events = OutboxEvent.query.filter(
+            OutboxEvent.status == 'pending',
+            OutboxEvent.available_at <= now
+        ).order_by(OutboxEvent.id).limit(batch_size).with_for_update(skip_locked=True).all()
+        if not events:
+            break
+
+        for outbox_event in events:
+            try:
+                with db.session.begin_nested():
+                    handler = HANDLERS.get(outbox_event.topic)
+                    if handler is None:
+                        raise LookupError(f'未注册的事件类型: {outbox_event.topic}')
+                    handler(json.loads(outbox_event.payload))
+                db.session.delete(outbox_event)
+            except Exception as e:
+                outbox_event.attempts += 1
+                outbox_event.last_error = str(e)[:1000]
+                if outbox_event.attempts >= max_attempts:
+                    outbox_event.status = 'failed'
+                else:
+                    outbox_event.available_at = now + _backoff(outbox_event.attempts)
+        db.session.commit()
+
+        processed += len(events)
+        if len(events) < batch_size:
+            break
+    return processed
+
+
+def drain_options(config):
+    return {
+        'batch_size': config.get('OUTBOX_BATCH_SIZE', 100),
+        'max_attempts': config.get('OUTBOX_MAX_ATTEMPTS', 8),
+    }
+
+
+class OutboxWorker:
+    """进程内 worker：有新事件提交时立即唤醒，否则按间隔轮询（处理到期的重试）"""
+
+    def __init__(self):
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self, app):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, args=(app,), name='outbox-worker', daemon=True)
+                self._thread.start()
+
+    def wake(self):
+        self._wakeup.set()
+
+    def _run(self, app):
+        poll_seconds = app.config.get('OUTBOX_POLL_SECONDS', 5)
+        while True:
+            self._wakeup.wait(poll_seconds)
+            self._wakeup.clear()
+            try:
+                with app.app_context():
+                    drain(**drain_options(app.config))
+            except Exception as e:
+                print(f"❌ outbox 处理失败: {e}")
+
+
+outbox_worker = OutboxWorker()
+
+
+def install_session_hooks(session):
+    """提交了新事件的事务结束后唤醒 worker"""
+
+    @event.listens_for(session, 'after_flush')
+    def _mark(sess, flush_context):
+        if any(isinstance(obj, OutboxEvent) for obj in sess.new):
+            sess.info['outbox_pending'] = True
+
+    @event.listens_for(session, 'after_commit')
+    def _wake(sess):
+        if sess.info.pop('outbox_pending', False):
+            outbox_worker.wake()
+
+    @event.listens_for(session, 'after_rollback')
+    def _discard(sess):
+        sess.info.pop('outbox_pending', None)
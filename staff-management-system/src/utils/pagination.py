@@ -0,0 +1,89 @@
+"""
+游标(keyset)分页工具
+按 (created_at, id) 倒序翻页，每一页的代价与翻到第几页无关
+"""
+
+import base64
+import json
+from datetime import datetime
+from sqlalchemy import and_, or_
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def parse_limit(value, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    """解析分页大小，非法值回退为默认值，并限制上限"""
+    try:
+        limit = int(value) if value is not None else default
+    except (ValueError, TypeError):
+        limit = default
+    if limit <= 0:
+        limit = default
+    return min(limit, maximum)
+
+
+def parse_bool(value, default=False):
+    """解析 true/false 查询参数"""
+    if value is None:
+        return default
+    return str(value).lower() in ('1', 'true', 'yes')
+
+
+def encode_cursor(sort_value, row_id):
+    """将 (排序值, id) 编码为不透明的游标字符串"""
+    if isinstance(sort_value, datetime):
+        sort_value = sort_value.isoformat()
+    raw = json.dumps([sort_value, row_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """解析游标，返回 (datetime, id)；格式错误时抛出 ValueError"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return datetime.fromisoformat(sort_value), int(row_id)
+    except Exception:
+        raise ValueError('无效的分页游标')
+
+
+def keyset_filter(sort_column, id_column, cursor, newer=False):
+    """生成“排在游标之后”的过滤条件（倒序）；newer=True 时取比游标更新的记录"""
+    sort_value, row_id = decode_cursor(cursor)
+    if newer:
+        return or_(
+            sort_column > sort_value,
+            and_(sort_column == sort_value, id_column > row_id)
+        )
+    return or_(
+        sort_column < sort_value,
+        and_(sort_column == sort_value, id_column < row_id)
+    )
+
+
+def keyset_query(query, sort_column, id_column, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """构造一页的查询（多取一条用于判断是否还有下一页），不执行"""
+    if cursor:
+        query = query.filter(keyset_filter(sort_column, id_column, cursor))
+    return query.order_by(sort_column.desc(), id_column.desc()).limit(limit + 1)
+
+
+def keyset_page(query, sort_column, id_column, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """
+    执行一次游标分页查询
+    返回 (当前页记录, 下一页游标)，没有下一页时游标为 None
+    """
+    rows = keyset_query(query, sort_column, id_column, cursor, limit).all()
+    return split_page(rows, sort_column, id_column, limit)
+
+
+def split_page(rows, sort_column, id_column, limit):
+    """把 keyset_query 的结果拆成 (当前页记录, 下一页游标)"""
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, sort_column.key), getattr(last, id_column.key))
+
+    return rows, next_cursor
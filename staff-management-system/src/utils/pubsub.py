@@ -0,0 +1,178 @@
+"""
+通知推送的进程内发布/订阅中心
+每个 SSE 连接订阅一个队列；事务提交后才投递事件，回滚的写入不会推送。
+跨 gunicorn worker：
+    PostgreSQL：通过 LISTEN/NOTIFY 广播，每个 worker 一个监听线程（首次有订阅时启动）；
+        pg_notify 在写入事务自己的连接上执行，每次 flush 合并为一条语句，由数据库在提交时投递、回滚时丢弃
+    SQLite：只在本进程内分发（单 worker 部署），事务提交后发布
+事件只携带 ID，订阅方收到后自行读取最新数据，避免 NOTIFY 的负载大小限制
+"""
+
+import json
+import queue
+import select
+import threading
+import time
+from collections import defaultdict
+from sqlalchemy import event, text
+
+CHANNEL = 'notifications'
+
+# 每个订阅队列的最大长度，客户端消费太慢时丢弃事件（下一次事件会带上最新未读数）
+SUBSCRIBER_QUEUE_SIZE = 100
+
+
+class LocalBroker:
+    """单进程分发"""
+
+    # 事件在事务提交后由进程内发布
+    transactional = False
+
+    def __init__(self, hub):
+        self.hub = hub
+
+    def publish(self, user_id, payload):
+        self.hub.dispatch(user_id, payload)
+
+    def start(self):
+        pass
+
+
+class PostgresBroker:
+    """通过 PostgreSQL LISTEN/NOTIFY 在多个 worker 之间广播"""
+
+    # 事件在写入事务内发出，由数据库在提交时投递
+    transactional = True
+
+    def __init__(self, hub, engine):
+        self.hub = hub
+        self.engine = engine
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def notify(self, connection, events):
+        """在给定连接的当前事务中为每个事件执行 pg_notify，一次往返"""
+        messages = [json.dumps({'user_id': user_id, 'event': payload}) for user_id, payload in events]
+        connection.execute(
+            text('SELECT pg_notify(:channel, message) FROM unnest(CAST(:messages AS text[])) AS message'),
+            {'channel': CHANNEL, 'messages': messages}
+        )
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._listen, name='notification-listener', daemon=True)
+                self._thread.start()
+
+    def _listen(self):
+        while True:
+            raw = None
+            try:
+                raw = self.engine.raw_connection()
+                conn = raw.driver_connection
+                conn.autocommit = True
+                with conn.cursor() as cursor:
+                    cursor.execute(f'LISTEN {CHANNEL}')
+                while True:
+                    if select.select([conn], [], [], 30) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        notify = conn.notifies.pop(0)
+                        message = json.loads(notify.payload)
+                        self.hub.dispatch(message['user_id'], message['event'])
+            except Exception as e:
+                print(f"❌ 通知监听连接断开，5秒后重连: {e}")
+                if raw is not None:
+                    try:
+                        raw.invalidate()
+                    except Exception:
+                        pass
+                time.sleep(5)
+
+
+class NotificationHub:
+    def __init__(self):
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+        self.broker = LocalBroker(self)
+
+    def init_app(self, engine):
+        if engine.dialect.name == 'postgresql':
+            self.broker = PostgresBroker(self, engine)
+
+    def subscribe(self, user_id):
+        self.broker.start()
+        subscriber = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        with self._lock:
+            self._subscribers[user_id].add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, user_id, subscriber):
+        with self._lock:
+            subscribers = self._subscribers.get(user_id)
+            if subscribers:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self._subscribers[user_id]
+
+    def dispatch(self, user_id, payload):
+        """分发给本进程内该用户的所有订阅者"""
+        with self._lock:
+            subscribers = list(self._subscribers.get(user_id, ()))
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(payload)
+            except queue.Full:
+                pass
+
+    def publish(self, user_id, payload):
+        try:
+            self.broker.publish(user_id, payload)
+        except Exception as e:
+            # 推送失败不影响业务写入，客户端重连时会拿到最新状态
+            print(f"❌ 通知推送失败: {e}")
+
+    def notify_in_transaction(self, session):
+        """PostgreSQL：把 session 中登记的事件通过它自己的连接发出，随事务提交或回滚"""
+        events = session.info.pop('hub_events', None)
+        if events:
+            self.broker.notify(session.connection(), events)
+
+
+notification_hub = NotificationHub()
+
+
+def queue_event(session, user_id, payload):
+    """登记一个事件，在 session 提交后发布（用于不经过 flush 的批量写入）"""
+    session.info.setdefault('hub_events', []).append((user_id, payload))
+
+
+def install_session_hooks(session, notification_model):
+    """通知的新增/修改/删除在 flush 时登记事件，事务提交后统一发布"""
+
+    @event.listens_for(session, 'after_flush')
+    def _collect(sess, flush_context):
+        for obj in sess.new:
+            if isinstance(obj, notification_model):
+                queue_event(sess, obj.user_id, {'type': 'notification', 'id': obj.id})
+        for obj in list(sess.dirty) + list(sess.deleted):
+            if isinstance(obj, notification_model):
+                queue_event(sess, obj.user_id, {'type': 'unread_changed'})
+        if notification_hub.broker.transactional:
+            notification_hub.notify_in_transaction(sess)
+
+    @event.listens_for(session, 'before_commit')
+    def _notify(sess):
+        # queue_event 登记的事件不一定伴随 flush，提交前补发；提交过程中的最后一次 flush 由 _collect 处理
+        if notification_hub.broker.transactional:
+            notification_hub.notify_in_transaction(sess)
+
+    @event.listens_for(session, 'after_commit')
+    def _publish(sess):
+        for user_id, payload in sess.info.pop('hub_events', []):
+            notification_hub.publish(user_id, payload)
+
+    @event.listens_for(session, 'after_rollback')
+    def _discard(sess):
+        sess.info.pop('hub_events', None)
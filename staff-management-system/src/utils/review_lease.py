@@ -0,0 +1,70 @@
+"""
+审核工作队列的租约
+多个管理员同时审核时，/submissions/next 把最早的待审核提交租给调用者一段时间，
+租约期内其他管理员领取不到、也不能审核这些提交；审核完成、主动释放或租约到期后重新进入队列。
+领取：
+    PostgreSQL：SELECT ... FOR UPDATE SKIP LOCKED 选出候选行，并发领取的事务互相跳过，不排队等锁
+    SQLite：单条 UPDATE ... WHERE id IN (子查询)，整条语句持有库级写锁，天然互斥
+"""
+
+from datetime import datetime, timedelta
+from sqlalchemy import select, update, or_, and_, case
+from src.models.user import db, TaskSubmission
+
+
+def lease_available(admin_id, now):
+    """可以领取的提交：待审核，且没有租约、租约已过期或本来就租给了自己"""
+    return and_(
+        TaskSubmission.review_status == 'pending',
+        or_(
+            TaskSubmission.lease_expires_at.is_(None),
+            TaskSubmission.lease_expires_at < now,
+            TaskSubmission.leased_by == admin_id
+        )
+    )
+
+
+def leased_by_other(submission, admin_id, now=None):
+    """提交是否正被其他管理员租用（租约未过期）"""
+    now = now or datetime.utcnow()
+    return submission.leased_by is not None and submission.leased_by != admin_id \
+        and submission.lease_expires_at is not None and submission.lease_expires_at >= now
+
+
+def lease_submissions(admin_id, limit, lease_seconds):
+    """
+    把最早的 limit 个可领取提交租给管理员（已持有的租约一并续期），不提交事务
+    返回 (按提交时间排序的提交列表, 租约到期时间)；调用方序列化后再提交，避免提交后逐行重新加载
+    """
+    now = datetime.utcnow()
+    expires_at = now + timedelta(seconds=lease_seconds)
+    available = lease_available(admin_id, now)
+    # 自己已持有的租约排在最前，重复调用拿到的是同一批提交
+    own_first = case((TaskSubmission.leased_by == admin_id, 0), else_=1)
+    candidates = select(TaskSubmission.id).where(available)\
+        .order_by(own_first, TaskSubmission.submitted_at, TaskSubmission.id).limit(limit)
+
+    if db.engine.dialect.name == 'postgresql':
+        # 被其他事务锁住的行直接跳过，并发领取互不阻塞
+        ids = db.session.execute(candidates.with_for_update(skip_locked=True)).scalars().all()
+        target = TaskSubmission.id.in_(ids)
+    else:
+        target = TaskSubmission.id.in_(candidates)
+
+    db.session.execute(
+        update(TaskSubmission).where(target, available).values(
+            leased_by=admin_id, lease_expires_at=expires_at
+        ).execution_options(synchronize_session=False)
+    )
+    # 本次写入的到期时间唯一标识这一批租约
+    submissions = TaskSubmission.query.filter(
+        TaskSubmission.leased_by == admin_id,
+        TaskSubmission.lease_expires_at == expires_at
+    ).order_by(TaskSubmission.submitted_at, TaskSubmission.id).all()
+    return submissions, expires_at
+
+
+def release_lease(submission):
+    """清除提交的租约，不提交事务"""
+    submission.leased_by = None
+    submission.lease_expires_at = None
@@ -0,0 +1,29 @@
+"""
+进程内的周期任务
+每个任务一个守护线程，任务本身必须是幂等的（多个 worker 同时执行也不会出错）
+"""
+
+import threading
+import time
+
+_started = set()
+_lock = threading.Lock()
+
+
+def start_periodic(name, interval_seconds, job, initial_delay=60):
+    """按固定间隔在后台线程中执行 job()，同名任务在进程内只启动一次"""
+    with _lock:
+        if name in _started:
+            return
+        _started.add(name)
+
+    def loop():
+        time.sleep(initial_delay)
+        while True:
+            try:
+                job()
+            except Exception as e:
+                print(f"❌ 后台任务 {name} 执行失败: {e}")
+            time.sleep(interval_seconds)
+
+    threading.Thread(target=loop, name=name, daemon=True).start()
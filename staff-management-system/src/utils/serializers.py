@@ -0,0 +1,62 @@
+"""
+列表序列化工具
+一次性批量加载关联数据（用户名、任务标题），避免 to_dict() 中逐行懒加载造成的 N+1 查询
+无论列表有多少行，每个列表接口只额外执行固定次数的查询
+"""
+
+from src.models.user import db, User, Task, SubmissionFile
+
+
+def load_user_names(user_ids):
+    """批量查询 {用户ID: 用户名}"""
+    user_ids = {uid for uid in user_ids if uid is not None}
+    if not user_ids:
+        return {}
+    rows = db.session.query(User.id, User.username).filter(User.id.in_(user_ids)).all()
+    return {row.id: row.username for row in rows}
+
+
+def load_task_info(task_ids):
+    """批量查询 {任务ID: (标题, 最大积分)}"""
+    task_ids = {tid for tid in task_ids if tid is not None}
+    if not task_ids:
+        return {}
+    rows = db.session.query(Task.id, Task.title, Task.max_points).filter(Task.id.in_(task_ids)).all()
+    return {row.id: (row.title, row.max_points) for row in rows}
+
+
+def load_submission_files(submission_ids):
+    """批量查询 {提交ID: [附件字典]}"""
+    submission_ids = {sid for sid in submission_ids if sid is not None}
+    if not submission_ids:
+        return {}
+    files = {}
+    rows = SubmissionFile.query.filter(SubmissionFile.submission_id.in_(submission_ids))\
+        .order_by(SubmissionFile.id).all()
+    for row in rows:
+        files.setdefault(row.submission_id, []).append(row.to_dict())
+    return files
+
+
+def serialize_tasks(tasks):
+    """序列化任务列表：1 次查询加载创建者和接受者的用户名"""
+    user_names = load_user_names(
+        [task.created_by for task in tasks] + [task.assigned_to for task in tasks]
+    )
+    return [task.to_dict(user_names=user_names) for task in tasks]
+
+
+def serialize_submissions(submissions, detail=True):
+    """序列化提交列表：3 次查询分别加载任务信息、提交者用户名和附件；detail=False 时不含大字段"""
+    task_info = load_task_info(submission.task_id for submission in submissions)
+    user_names = load_user_names(submission.user_id for submission in submissions)
+    files = load_submission_files(submission.id for submission in submissions)
+    return [
+        submission.to_dict(task_info=task_info, user_names=user_names, detail=detail, files=files)
+        for submission in submissions
+    ]
+
+
+def serialize_notifications(notifications):
+    """序列化通知列表：通知只引用ID，不需要额外查询"""
+    return [notification.to_dict() for notification in notifications]
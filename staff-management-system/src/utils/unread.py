@@ -0,0 +1,38 @@
+"""
+每个用户的未读通知计数（user.unread_notification_count）
+所有改变未读状态的写入都在同一事务里调整计数，读取只需要一次主键查询；
+计数出现偏差时用 maintenance.py recount-unread 重算
+"""
+
+from sqlalchemy import bindparam, func
+from src.models.user import db, User, Notification
+
+
+def unread_count(user_id):
+    """返回用户的未读通知数，用户不存在时返回 None"""
+    return db.session.query(User.unread_notification_count).filter(User.id == user_id).scalar()
+
+
+def adjust_unread_counts(deltas):
+    """按 {用户ID: 增量} 调整未读计数，一条 executemany 语句，不提交事务"""
+    # 按用户ID排序加锁，避免并发事务之间死锁
+    params = [{'uid': user_id, 'delta': delta} for user_id, delta in sorted(deltas.items()) if delta]
+    if not params:
+        return
+
+    users = User.__table__
+    db.session.execute(
+        users.update().where(users.c.id == bindparam('uid')).values(
+            unread_notification_count=users.c.unread_notification_count + bindparam('delta'),
+            updated_at=users.c.updated_at  # 计数不在列表中展示，不使列表 ETag 失效
+        ),
+        params
+    )
+
+
+def unread_deltas(*criteria):
+    """删除通知前调用：统计将被删除的未读通知，返回 {用户ID: 负增量}"""
+    rows = db.session.query(Notification.user_id, func.count(Notification.id)).filter(
+        Notification.is_read == False, *criteria
+    ).group_by(Notification.user_id).all()
+    return {user_id: -count for user_id, count in rows}
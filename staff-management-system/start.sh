@@ -7,4 +7,4 @@ cd /opt/render/project/src/staff-management-system
 pip install -r requirements.txt
 
 # 启动应用
-exec gunicorn src.main:app --bind 0.0.0.0:$PORT --workers 1 --timeout 60
\ No newline at end of file
+exec gunicorn src.main:app --bind 0.0.0.0:$PORT --workers 1 --worker-class gthread --threads 32 --timeout 60
\ No newline at end of file
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+缓存失效测试
+校验写入事务提交后才清空缓存：事务未提交期间的并发读取不能把旧数据重新写回缓存
+用法：
+    python test_cache_invalidation.py
+    python -m pytest -q test_cache_invalidation.py
+使用临时 SQLite 文件，不会影响正式数据库
+"""
+
+import os
+import sys
+import tempfile
+import threading
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+# 必须在导入应用之前设置数据库地址
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='cache_test_'), 'test.db')
+os.environ['OUTBOX_WORKER'] = 'false'
+
+from flask_jwt_extended import create_access_token
+from src.main import app
+from src.models.user import db, User, Task, PointRecord, OutboxEvent
+from src.routes.dashboard import summary_cache
+from src.routes.points import timeseries_cache
+from src.utils.cache import TTLCache
+
+
+def _admin_headers():
+    with app.app_context():
+        admin = User.query.filter_by(username='admin').first()
+        return admin.id, {'Authorization': f'Bearer {create_access_token(identity=admin.id)}'}
+
+
+def _new_task(admin_id):
+    return Task(
+        title='缓存测试', description='cache', publisher_name='test',
+        start_date=date.today(), end_date=date.today() + timedelta(days=1),
+        max_points=1, created_by=admin_id
+    )
+
+
+def test_open_write_is_not_recached():
+    """写入已 flush 未提交时读取汇总，提交后必须读到新数据"""
+    admin_id, headers = _admin_headers()
+    client = app.test_client()
+    before = client.get('/api/dashboard/summary', headers=headers).json['total_tasks']
+
+    flushed = threading.Event()
+    read_done = threading.Event()
+
+    def writer():
+        with app.app_context():
+            db.session.add(_new_task(admin_id))
+            db.session.flush()
+            flushed.set()
+            read_done.wait(10)
+            db.session.commit()
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    assert flushed.wait(10)
+
+    # 写入事务还没提交：读到的是旧值，并且可能被缓存
+    during = client.get('/api/dashboard/summary', headers=headers).json['total_tasks']
+    read_done.set()
+    thread.join(10)
+
+    after = client.get('/api/dashboard/summary', headers=headers).json['total_tasks']
+    assert during == before
+    assert after == before + 1, f'提交后仍返回旧的任务数: {after}'
+
+
+def test_rollback_keeps_cache():
+    admin_id, headers = _admin_headers()
+    client = app.test_client()
+    client.get('/api/dashboard/summary', headers=headers)
+    assert summary_cache.get(('admin', admin_id)) is not None
+
+    with app.app_context():
+        db.session.add(_new_task(admin_id))
+        db.session.flush()
+        db.session.rollback()
+
+    assert summary_cache.get(('admin', admin_id)) is not None
+
+
+def test_compute_overlapping_clear_is_not_stored():
+    """计算期间缓存被清空（有写入提交），计算结果不写回"""
+    cache = TTLCache(ttl=60)
+
+    def compute():
+        cache.clear()
+        return 'stale'
+
+    assert cache.get_or_compute('key', compute) == 'stale'
+    assert cache.get('key') is None
+
+
+def test_timeseries_cache_only_tracks_points():
+    admin_id, _ = _admin_headers()
+    timeseries_cache.set('probe', 1)
+
+    with app.app_context():
+        # 与积分无关的写入不清空积分趋势缓存
+        db.session.add(OutboxEvent(topic='test', payload='{}'))
+        User.query.filter_by(id=admin_id).update({'unread_notification_count': User.unread_notification_count + 0})
+        db.session.commit()
+        assert timeseries_cache.get('probe') == 1
+
+        db.session.add(PointRecord(user_id=admin_id, points=1, type='bonus', description='cache'))
+        db.session.flush()
+        assert timeseries_cache.get('probe') == 1, '提交前不应清空'
+        db.session.commit()
+        assert timeseries_cache.get('probe') is None
+
+
+if __name__ == '__main__':
+    failed = 0
+    for name, test in list(globals().items()):
+        if name.startswith('test_') and callable(test):
+            try:
+                test()
+                print(f'✅ {name}')
+            except AssertionError as e:
+                failed += 1
+                print(f'❌ {name}: {e}')
+    sys.exit(1 if failed else 0)
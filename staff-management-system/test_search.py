@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+搜索测试
+校验中文子串（长短词）、多个词的 AND 匹配和 LIKE 通配符转义
+用法：
+    python test_search.py
+    python -m pytest -q test_search.py
+使用临时 SQLite 文件，不会影响正式数据库
+"""
+
+import os
+import sys
+import tempfile
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+# 必须在导入应用之前设置数据库地址
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='search_test_'), 'test.db')
+os.environ['OUTBOX_WORKER'] = 'false'
+
+from flask_jwt_extended import create_access_token
+from src.main import app
+from src.models.user import db, User, Task
+
+TITLES = ['季度客户满意度调查报告', '整理部门周报', '完成率 100% 的任务', '完成率 1000 的任务', 'snake_case 重命名']
+
+
+def _search(q):
+    with app.app_context():
+        admin = User.query.filter_by(username='admin').first()
+        headers = {'Authorization': f'Bearer {create_access_token(identity=admin.id)}'}
+        if not Task.query.filter(Task.title.in_(TITLES)).count():
+            for title in TITLES:
+                db.session.add(Task(
+                    title=title, description='搜索测试', publisher_name='测试',
+                    start_date=date.today(), end_date=date.today() + timedelta(days=1),
+                    max_points=1, created_by=admin.id
+                ))
+            db.session.commit()
+    response = app.test_client().get('/api/search', headers=headers, query_string={'q': q, 'type': 'tasks'})
+    assert response.status_code == 200, response.json
+    return sorted(task['title'] for task in response.json['tasks'])
+
+
+def test_chinese_substring():
+    # 三个字及以上走 trigram 索引，更短的走 LIKE，结果一致
+    assert _search('满意度调查') == ['季度客户满意度调查报告']
+    assert _search('客户') == ['季度客户满意度调查报告']
+    assert _search('周报') == ['整理部门周报']
+
+
+def test_terms_are_anded():
+    assert _search('客户 报告') == ['季度客户满意度调查报告']
+    assert _search('客户 周报') == []
+
+
+def test_like_wildcards_are_literal():
+    assert _search('100%') == ['完成率 100% 的任务']
+    assert _search('e_c') == ['snake_case 重命名']
+    assert _search('%') == ['完成率 100% 的任务']
+
+
+if __name__ == '__main__':
+    failed = 0
+    for name, test in list(globals().items()):
+        if name.startswith('test_') and callable(test):
+            try:
+                test()
+                print(f'✅ {name}')
+            except AssertionError as e:
+                failed += 1
+                print(f'❌ {name}: {e}')
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+提交审核通知测试
+校验被驳回后重新提交、再次审核的流程：同一个提交记录的新通知不能被唯一索引吞掉，未读数保持准确
+用法：
+    python test_submission_review.py
+    python -m pytest -q test_submission_review.py
+使用临时 SQLite 文件，不会影响正式数据库
+"""
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+# 必须在导入应用之前设置数据库地址
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='review_test_'), 'test.db')
+os.environ['OUTBOX_WORKER'] = 'false'
+
+from flask_jwt_extended import create_access_token
+from src.main import app
+from src.models.user import db, User, Notification
+from src.utils.outbox import drain
+
+
+def _headers(user_id):
+    with app.app_context():
+        return {'Authorization': f'Bearer {create_access_token(identity=user_id)}'}
+
+
+def _create_user(username):
+    with app.app_context():
+        user = User(username=username, email=f'{username}@example.com', role='user')
+        user.set_password('password')
+        db.session.add(user)
+        db.session.commit()
+        return user.id
+
+
+def _notifications(user_id, notification_type):
+    with app.app_context():
+        drain()
+        rows = Notification.query.filter_by(user_id=user_id, type=notification_type).all()
+        unread = db.session.get(User, user_id).unread_notification_count
+        return [(n.title, n.is_read) for n in rows], unread
+
+
+def test_reject_resubmit_approve():
+    client = app.test_client()
+    with app.app_context():
+        admin_id = User.query.filter_by(username='admin').first().id
+    admin = _headers(admin_id)
+    user_id = _create_user('resubmitter')
+    user = _headers(user_id)
+
+    task_id = client.post('/api/tasks', headers=admin, json={
+        'title': '重新提交测试', 'description': 'review', 'publisher_name': 'test',
+        'start_date': '2026-01-01', 'end_date': '2099-01-01', 'max_points': 10
+    }).json['task']['id']
+
+    assert client.post(f'/api/tasks/{task_id}/assign', headers=user).status_code == 200
+    submission_id = client.post(f'/api/tasks/{task_id}/submit', headers=user, json={}).json['submission']['id']
+    pending, _ = _notifications(admin_id, 'submission_pending')
+    assert len(pending) == 1
+
+    response = client.post(f'/api/submissions/{submission_id}/review', headers=admin,
+                           json={'review_status': 'rejected', 'awarded_points': 0})
+    assert response.status_code == 200
+    reviewed, unread = _notifications(user_id, 'submission_reviewed')
+    assert reviewed == [('任务审核未通过', False)] and unread == 1
+
+    # 被驳回的任务重新开放，同一用户再次领取并提交，复用同一个提交记录
+    assert client.post(f'/api/tasks/{task_id}/assign', headers=user).status_code == 200
+    resubmitted = client.post(f'/api/tasks/{task_id}/submit', headers=user, json={}).json['submission']
+    assert resubmitted['id'] == submission_id and resubmitted['review_status'] == 'pending'
+    pending, _ = _notifications(admin_id, 'submission_pending')
+    assert pending == [('新的任务提交', False)]
+
+    response = client.post(f'/api/submissions/{submission_id}/review', headers=admin,
+                           json={'review_status': 'approved', 'awarded_points': 8})
+    assert response.status_code == 200
+    reviewed, unread = _notifications(user_id, 'submission_reviewed')
+    assert reviewed == [('任务审核通过', False)], f'再次审核的结果通知丢失: {reviewed}'
+    assert unread == 1, f'未读数不准确: {unread}'
+
+
+if __name__ == '__main__':
+    failed = 0
+    for name, test in list(globals().items()):
+        if name.startswith('test_') and callable(test):
+            try:
+                test()
+                print(f'✅ {name}')
+            except AssertionError as e:
+                failed += 1
+                print(f'❌ {name}: {e}')
+    sys.exit(1 if failed else 0)